@@ -1,31 +1,131 @@
+import argparse
+import time
+
 import serial
 
-def modbus_crc(data: bytes) -> bytes:
-    crc = 0xFFFF
-    for pos in data:
-        crc ^= pos
-        for _ in range(8):
-            if crc & 1:
-                crc >>= 1
-                crc ^= 0xA001
-            else:
-                crc >>= 1
-    return bytes([crc & 0xFF, (crc >> 8) & 0xFF])
-
-ser = serial.Serial(port="COM15", baudrate=4800, bytesize=8, parity="N", stopbits=1, timeout=1)
-
-# Frame base: [FF][03][07][D0][00][01]
-frame = bytes([0xFF, 0x03, 0x07, 0xD0, 0x00, 0x01])
-cmd = frame + modbus_crc(frame)
-
-print("🔎 Enviando comando broadcast para ler Slave ID...")
-ser.write(cmd)
-
-resp = ser.read(7)  # deve vir 7 bytes de resposta
-if resp:
-    slave_id = resp[0]
+from modbus_rtu import ErroModbus, montar_comando, transacao
+from registro_estacoes import (CODIGOS_BAUDRATE, atualizar_barramento, barramentos_do_registro,
+                               carregar_registro, codigos_api, ids_conhecidos, salvar_registro)
+
+# Configurações da porta serial
+PORTA = "COM15"      # No Linux: /dev/ttyUSB0
+BAUDRATE = 4800
+TIMEOUT = 1
+
+# Faixa de endereços Modbus válidos para escravos
+PRIMEIRO_ID = 1
+ULTIMO_ID = 247
+
+# Tempo extra para o dispositivo processar a requisição antes de responder
+MARGEM_RESPOSTA = 0.03  # segundos
+
+# Registradores de configuração (manual, "Parameters registers" e calibração)
+REG_SLAVE_ID = 0x07D0
+REG_BAUDRATE = 0x07D1
+REG_OFFSET_VENTO = 0x6000
+
+
+def timeout_sonda(baudrate: int) -> float:
+    """
+    Timeout por endereço: tempo no fio da requisição (8 bytes) e da resposta
+    (7 bytes) a 11 bits por caractere, mais a margem de processamento.
+    """
+    return (8 + 7) * 11 / baudrate + MARGEM_RESPOSTA
+
+
+def consultar_broadcast(ser):
+    """Lê o Slave ID via broadcast (0xFF); só funciona com um dispositivo no barramento"""
+    print("🔎 Enviando comando broadcast para ler Slave ID...")
+    try:
+        resp = transacao(ser, montar_comando(0xFF, REG_SLAVE_ID, 1))
+    except ErroModbus as e:
+        print(f"❌ Nenhuma resposta válida recebida ({e}).")
+        return None
+    slave_id = int.from_bytes(resp[3:5], byteorder="big")  # o cabeçalho ecoa 0xFF, o ID vem nos dados
     print(f"✅ Dispositivo respondeu com Slave ID = {slave_id}, resposta bruta: {resp.hex()}")
-else:
-    print("❌ Nenhuma resposta recebida.")
+    return slave_id
+
+
+def ordem_varredura(conhecidos):
+    """IDs já vistos primeiro (mais prováveis), depois o resto da faixa"""
+    vistos = [i for i in conhecidos if PRIMEIRO_ID <= i <= ULTIMO_ID]
+    ja_vistos = set(vistos)
+    return vistos + [i for i in range(PRIMEIRO_ID, ULTIMO_ID + 1) if i not in ja_vistos]
+
+
+def sondar(ser, slave_id):
+    """Lê o registrador de Slave ID; devolve a latência em segundos ou None"""
+    inicio = time.perf_counter()
+    try:
+        transacao(ser, montar_comando(slave_id, REG_SLAVE_ID, 1))
+    except ErroModbus:
+        return None
+    return time.perf_counter() - inicio
+
+
+def ler_configuracao(ser, slave_id):
+    """Registradores de configuração do dispositivo encontrado (None se não suportado)"""
+    config = {}
+    for nome, reg in (("baudrate_codigo", REG_BAUDRATE), ("offset_vento", REG_OFFSET_VENTO)):
+        try:
+            resp = transacao(ser, montar_comando(slave_id, reg, 1))
+            config[nome] = int.from_bytes(resp[3:5], byteorder="big")
+        except ErroModbus:
+            config[nome] = None
+    config["baudrate"] = CODIGOS_BAUDRATE.get(config["baudrate_codigo"])
+    return config
+
+
+def varrer_barramento(ser, baudrate, conhecidos=(), esperadas=None):
+    """Sonda os endereços com timeout curto e devolve as estações encontradas"""
+    encontradas = []
+    ser.timeout = timeout_sonda(baudrate)
+    inicio = time.monotonic()
+    for slave_id in ordem_varredura(conhecidos):
+        latencia = sondar(ser, slave_id)
+        if latencia is None:
+            continue
+        print(f"  ✅ Estação {slave_id:3d} respondeu em {latencia * 1e3:.0f} ms")
+        encontradas.append({"id": slave_id, "latencia_ms": round(latencia * 1e3, 1)})
+        if esperadas and len(encontradas) >= esperadas:
+            break
+
+    # Configuração lida depois, com o timeout normal
+    ser.timeout = TIMEOUT
+    for estacao in encontradas:
+        estacao.update(ler_configuracao(ser, estacao["id"]))
+    print(f"🔎 Varredura concluída em {time.monotonic() - inicio:.1f} s: {len(encontradas)} estação(ões)")
+    return encontradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Varredura de estações no barramento RS485")
+    parser.add_argument("--porta", default=PORTA)
+    parser.add_argument("--baudrate", type=int, default=BAUDRATE)
+    parser.add_argument("--esperadas", type=int, help="para depois de encontrar N estações")
+    parser.add_argument("--broadcast", action="store_true", help="só consulta o ID via broadcast (um dispositivo)")
+    args = parser.parse_args()
+
+    with serial.Serial(port=args.porta, baudrate=args.baudrate, bytesize=8, parity="N", stopbits=1, timeout=TIMEOUT) as ser:
+        if args.broadcast:
+            consultar_broadcast(ser)
+            return
+
+        registro = carregar_registro()
+        conhecidos = ids_conhecidos(registro, args.porta)
+        print(f"🔎 Varrendo {args.porta} @ {args.baudrate} baud "
+              f"(timeout {timeout_sonda(args.baudrate) * 1e3:.0f} ms/endereço, {len(conhecidos)} ID(s) conhecidos)")
+        encontradas = varrer_barramento(ser, args.baudrate, conhecidos, args.esperadas)
+
+    atualizar_barramento(registro, args.porta, args.baudrate, encontradas)
+    salvar_registro(registro)
+    print(f"💾 Registro salvo com {len(encontradas)} estação(ões) em {args.porta}")
+    # Cada porta é varrida sozinha: avisa se os IDs achados já existem em outro barramento
+    try:
+        codigos_api(registro, barramentos_do_registro(registro))
+    except ValueError as e:
+        print(f"⚠️ {e}")
+
 
-ser.close()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import logging
+import serial
+from datetime import datetime
+
+from agendador import Agendador, Grupo
+from modbus_rtu import detectar_baudrate
+from registro_estacoes import barramentos_do_registro, carregar_registro
+
+# Configurações da porta serial
+PORTA = "COM15"      # No Linux: /dev/ttyUSB0
+BAUDRATE = 4800
+TIMEOUT = 1
+ESTACOES = barramentos_do_registro(carregar_registro()).get(PORTA, [1])
+
+# Uso máximo do barramento por tick (fração)
+ORCAMENTO_BARRAMENTO = 0.7
+
+# Grupos de registradores com período próprio (endereço, fator de escala e sinal)
+GRUPOS = [
+    # Vento muda em segundos: 1 Hz
+    Grupo("vento", 1, {
+        "Wind speed (m/s)":        (0x1F4, 0.01, False),
+        "Wind strength":           (0x1F5, 1, False),
+        "Wind direction (0-7)":    (0x1F6, 1, False),
+        "Wind direction (°)":      (0x1F7, 1, False),
+    }),
+    Grupo("ambiente", 10, {
+        "Humidity (%)":            (0x1F8, 0.1, False),
+        "Temperature (°C)":        (0x1F9, 0.1, True),
+        "Noise (dB)":              (0x1FA, 0.1, False),
+        "Illuminance High":        (0x1FE, 1, False),
+        "Illuminance Low":         (0x1FF, 1, False),
+        "Illuminance Extra":       (0x200, 100, False),
+        "Rainfall (mm)":           (0x201, 0.1, False),
+    }),
+    # Pressão e particulados mudam em minutos
+    Grupo("lento", 60, {
+        "PM2.5 (µg/m3)":           (0x1FB, 1, False),
+        "PM10 (µg/m3)":            (0x1FC, 1, False),
+        "Pressure (kPa)":          (0x1FD, 0.1, False),
+        "Solar irradiance (W/m²)": (0x204, 1, True),
+    }),
+]
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def mostrar(leituras):
+    hora = datetime.now().strftime('%H:%M:%S')
+    for estacao, valores in leituras.items():
+        texto = "  ".join(f"{nome}={valor:.1f}" if valor is not None else f"{nome}=N/A"
+                          for nome, valor in valores.items())
+        print(f"📡 {hora} Estação {estacao}: {texto}")
+
+
+def main():
+    with serial.Serial(port=PORTA, baudrate=BAUDRATE, timeout=TIMEOUT) as ser:
+        baudrate = detectar_baudrate(ser, ESTACOES[:3])
+        print(f"🔎 Baud rate detectado: {baudrate or 'nenhuma resposta, usando ' + str(BAUDRATE)}")
+        # O orçamento do barramento depende do baud rate real
+        agendador = Agendador(ESTACOES, GRUPOS, baudrate or BAUDRATE, orcamento=ORCAMENTO_BARRAMENTO)
+        agendador.executar(ser, mostrar)
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,105 @@
 import serial
 import minimalmodbus
+import sys
 import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import requests
+
+from envio_api import API_BASE, DESCARTAR_ANTIGA, FORMATO_TEXTO, EnviadorLotes, EnvioEmSegundoPlano, criar_sessao
+from banda_morta import FiltroBandaMorta
+from caixa_saida import CaixaSaida
+from disjuntor import Disjuntor, FECHADO, SONDA
+from fila_comandos import FilaComandos, NORMAL, URGENTE
+from modbus_rtu import BAUDRATES_SUPORTADOS, detectar_baudrate
+from registro_estacoes import barramentos_do_registro, carregar_registro, codigos_api
 
 # ================================
 # CONFIGURAÇÕES GERAIS
 # ================================
-PORTA = 'COM15'        # porta serial
-BAUDRATE = 4800        # baud rate da estação
-ESTACOES = [1, 2, 3, 4, 5]  # IDs das estações conectadas
-ENDPOINT = "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/storeOrUpdate"
+BAUDRATE = 4800        # baud rate da estação (se o registro não informar outro)
+# Porta serial (adaptador USB-RS485) → IDs das estações ligadas nela, lido do
+# registro gerado pela varredura (python Id_Station.py --porta COM15)
+REGISTRO = carregar_registro()
+BARRAMENTOS = barramentos_do_registro(REGISTRO) or {
+    'COM15': [1, 2, 3, 4, 5],   # sem varredura ainda
+}
+# Slave IDs só são únicos dentro de um barramento: cada estação é (porta, slave_id)
+# e vai para a API como "Estação <código>" ("codigo" no registro, senão o slave ID).
+# IDs repetidos entre barramentos sem "codigo" distinto param aqui com ValueError.
+CODIGOS = codigos_api(REGISTRO, BARRAMENTOS)
+ESTACAO_DO_CODIGO = {codigo: chave for chave, codigo in CODIGOS.items()}
+ENDPOINT = f"{API_BASE}/estacoes_mets/storeOrUpdate"   # API_BASE: variável IOTHUB_URL
+TAMANHO_LOTE = 100     # leituras por POST
+INTERVALO_ENVIO = 0    # segundos entre envios (0 = ao fim de cada ciclo)
+TAMANHO_FILA = 1000    # leituras aguardando a thread de envio
+POLITICA_FILA = DESCARTAR_ANTIGA   # fila cheia: descartar_antiga, descartar_nova ou bloquear
+VAZAO_REENVIO = 2000   # leituras/s no máximo ao reenviar o acumulado de uma queda da API
+FORMATO_ENVIO = FORMATO_TEXTO   # "texto" (JSON "T:..|H:..") ou "binario" (formato_binario.py)
+COMPRIMIR_ENVIO = False         # gzip no corpo binário
+# Texto em lote: o ciclo inteiro numa lista JSON por POST. Exige que o
+# storeOrUpdate do servidor aceite listas; se ele responder 400/415, o envio
+# volta sozinho a um objeto por POST.
+ENVIO_EM_LOTE = False
+# Envio por exceção: só sensores que mudaram além da banda (banda_morta.BANDAS).
+# Exige que o storeOrUpdate do servidor mescle os sensores recebidos no registro
+# da estação; se ele substitui o registro, os dashboards perdem os outros campos.
+ENVIO_POR_EXCECAO = False
+SILENCIO_MAXIMO = 15 * 60       # segundos: cada sensor é reenviado pelo menos nesse intervalo
+
+# Disjuntor por estação: após N falhas seguidas a estação só é sondada
+# (1 registrador) com espera exponencial entre ESPERA_INICIAL e ESPERA_MAXIMA
+LIMITE_FALHAS = 3
+ESPERA_INICIAL = 60    # segundos
+ESPERA_MAXIMA = 3600   # segundos
+
+INTERVALO_LEITURA = 60  # segundos entre ciclos
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # ================================
 # CONFIGURAÇÃO MODBUS
 # ================================
-instrument = minimalmodbus.Instrument(PORTA, 1)
-instrument.serial.baudrate = BAUDRATE
-instrument.serial.bytesize = 8
-instrument.serial.parity   = serial.PARITY_NONE
-instrument.serial.stopbits = 1
-instrument.serial.timeout  = 1
+def criar_instrumento(porta):
+    """Cria o instrumento Modbus de um barramento (um por porta serial)"""
+    instrument = minimalmodbus.Instrument(porta, 1)
+    instrument.serial.baudrate = REGISTRO.get(porta, {}).get("baudrate", BAUDRATE)
+    instrument.serial.bytesize = 8
+    instrument.serial.parity   = serial.PARITY_NONE
+    instrument.serial.stopbits = 1
+    instrument.serial.timeout  = 1
+
+    # Confere o baud rate real do barramento (começando pelo configurado)
+    configurado = instrument.serial.baudrate
+    candidatos = (configurado,) + tuple(b for b in BAUDRATES_SUPORTADOS if b != configurado)
+    estacoes = BARRAMENTOS.get(porta, [])[:3]
+    if estacoes:
+        detectado = detectar_baudrate(instrument.serial, estacoes, candidatos)
+        if detectado is None:
+            logging.warning("Nenhuma estação respondeu em %s; mantendo %d baud", porta, configurado)
+        elif detectado != configurado:
+            logging.info("Barramento %s detectado em %d baud (configurado %d)", porta, detectado, configurado)
+    return instrument
+
+# Instrumentos criados no primeiro uso (importar o módulo não abre portas)
+instrumentos = {}
+
+def obter_instrumento(porta):
+    if porta not in instrumentos:
+        instrumentos[porta] = criar_instrumento(porta)
+    return instrumentos[porta]
+
+def localizar_estacao(estacao):
+    """(porta, slave_id) da estação de código `estacao` (o N de "Estação N")"""
+    if estacao not in ESTACAO_DO_CODIGO:
+        raise ValueError(f"Estação {estacao} não está em nenhum barramento")
+    return ESTACAO_DO_CODIGO[estacao]
 
 # ================================
 # FUNÇÃO DE LEITURA
 # ================================
-def ler_estacao(slave_id):
+def ler_estacao(instrument, slave_id):
     """Lê todos os sensores da estação especificada"""
     try:
         instrument.address = slave_id
@@ -62,105 +136,216 @@ def ler_estacao(slave_id):
     except Exception as e:
         return {"erro": str(e)}
 
+# Um disjuntor por estação física: o mesmo slave ID em outro barramento é outra estação
+disjuntores = {
+    (porta, slave_id): Disjuntor(f"{CODIGOS[(porta, slave_id)]} ({porta} ID {slave_id})",
+                                 LIMITE_FALHAS, ESPERA_INICIAL, ESPERA_MAXIMA)
+    for porta, slave_id in CODIGOS
+}
+
+def sondar_estacao(instrument, slave_id):
+    """Leitura barata (um registrador) para saber se a estação voltou"""
+    try:
+        instrument.address = slave_id
+        instrument.read_register(0x01F4, 0, functioncode=3, signed=False)
+        return True
+    except Exception:
+        return False
+
+def ler_estacao_protegida(instrument, porta, slave_id):
+    """Lê a estação respeitando o disjuntor dela"""
+    disjuntor = disjuntores[(porta, slave_id)]
+    acao = disjuntor.acao()
+    if acao is None:
+        return {"erro": f"disjuntor aberto, próxima sonda em {disjuntor.metricas()['proxima_sonda_em_s']:.0f} s"}
+
+    inicio = time.monotonic()
+    if acao == SONDA and not sondar_estacao(instrument, slave_id):
+        disjuntor.registrar_falha()
+        return {"erro": f"sonda sem resposta, próxima em {disjuntor.espera:.0f} s"}
+
+    dados = ler_estacao(instrument, slave_id)
+    if "erro" in dados:
+        disjuntor.registrar_falha()
+    else:
+        disjuntor.registrar_sucesso(time.monotonic() - inicio)
+    return dados
+
+# Comandos de escrita por barramento: executados pela thread que está com a
+# porta, entre uma estação e outra e no tempo ocioso entre ciclos
+filas = {porta: FilaComandos(porta) for porta in BARRAMENTOS}
+
+def ler_barramento(porta, estacoes):
+    """Lê em sequência as estações de um único barramento: {(porta, slave_id): dados}"""
+    instrument = obter_instrumento(porta)
+    fila = filas[porta]
+    resultados = {}
+    for estacao in estacoes:
+        resultados[(porta, estacao)] = ler_estacao_protegida(instrument, porta, estacao)
+        # No máximo um comando entre duas estações: a amostragem não atrasa
+        fila.executar_proximo()
+    return resultados
+
+# Um worker por porta: os barramentos são lidos em paralelo, as estações de
+# um mesmo barramento continuam em sequência (RS485 é half-duplex)
+executor = ThreadPoolExecutor(max_workers=len(BARRAMENTOS), thread_name_prefix="barramento")
+
+def ler_ciclo():
+    """Lê todos os barramentos ao mesmo tempo e junta os resultados do ciclo"""
+    futuros = [executor.submit(ler_barramento, porta, estacoes) for porta, estacoes in BARRAMENTOS.items()]
+    resultados = {}
+    for futuro in futuros:
+        resultados.update(futuro.result())
+    return dict(sorted(resultados.items()))
+
+def aguardar_proximo_ciclo(prazo):
+    """Até o próximo ciclo cada barramento fica livre para executar comandos"""
+    futuros = [executor.submit(filas[porta].executar_ate, prazo) for porta in BARRAMENTOS]
+    for futuro in futuros:
+        futuro.result()
+
 # ================================
 # FUNÇÕES DE CALIBRAÇÃO
 # ================================
-def inverter_direcao_vento(slave_id, inverter=True):
+# As escritas não vão direto para a porta: entram na fila do barramento e são
+# executadas entre leituras. Devolvem o Comando (comando.esperar() bloqueia
+# até a execução; ao_concluir(comando) é chamado logo depois).
+def informar_comando(comando):
+    """Callback padrão: mostra o resultado do comando"""
+    if comando.ok:
+        print(f"{comando.descricao} (executado em {comando.concluido_em - comando.enfileirado_em:.1f} s)")
+    else:
+        print(f"⚠️ Falha no comando '{comando.descricao}': {comando.erro}")
+
+# `estacao` é o código da estação (o N de "Estação N" nas leituras e na API)
+def enviar_comando_escrita(estacao, registrador, valor, descricao, prioridade=NORMAL, ao_concluir=informar_comando):
+    """Enfileira uma escrita FC06 no barramento da estação"""
+    porta, slave_id = localizar_estacao(estacao)
+
+    def executar():
+        instrument = obter_instrumento(porta)
+        instrument.address = slave_id
+        instrument.write_register(registrador, valor, functioncode=6)
+
+    return filas[porta].enviar(descricao, executar, prioridade, ao_concluir)
+
+def inverter_direcao_vento(estacao, inverter=True, prioridade=NORMAL, ao_concluir=informar_comando):
     """
     Define offset da direção do vento:
     inverter=False → normal (0)
     inverter=True  → invertido (180°)
     """
-    try:
-        instrument.address = slave_id
-        valor = 1 if inverter else 0
-        instrument.write_register(0x6000, valor, functioncode=6)
-        print(f"🌪️ Estação {slave_id}: Direção do vento ajustada para {'invertida' if inverter else 'normal'}.")
-    except Exception as e:
-        print(f"⚠️ Erro ao calibrar direção do vento: {e}")
+    valor = 1 if inverter else 0
+    descricao = f"🌪️ Estação {estacao}: Direção do vento ajustada para {'invertida' if inverter else 'normal'}."
+    return enviar_comando_escrita(estacao, 0x6000, valor, descricao, prioridade, ao_concluir)
 
-def zerar_velocidade_vento(slave_id):
+def zerar_velocidade_vento(estacao, prioridade=NORMAL, ao_concluir=informar_comando):
     """Zera o valor do vento após 10 segundos"""
-    try:
-        instrument.address = slave_id
-        instrument.write_register(0x6001, 0xAA, functioncode=6)
-        print(f"💨 Estação {slave_id}: Comando de zerar vento enviado (aguarde 10s).")
-    except Exception as e:
-        print(f"⚠️ Erro ao zerar vento: {e}")
+    descricao = f"💨 Estação {estacao}: Comando de zerar vento enviado (aguarde 10s)."
+    return enviar_comando_escrita(estacao, 0x6001, 0xAA, descricao, prioridade, ao_concluir)
 
-def zerar_chuva(slave_id):
+def zerar_chuva(estacao, prioridade=NORMAL, ao_concluir=informar_comando):
     """Zera o acumulado de chuva"""
-    try:
-        instrument.address = slave_id
-        instrument.write_register(0x6002, 0x5A, functioncode=6)
-        print(f"🌧️ Estação {slave_id}: Chuva acumulada zerada.")
-    except Exception as e:
-        print(f"⚠️ Erro ao zerar chuva: {e}")
+    descricao = f"🌧️ Estação {estacao}: Chuva acumulada zerada."
+    return enviar_comando_escrita(estacao, 0x6002, 0x5A, descricao, prioridade, ao_concluir)
+
+# Comandos digitados no terminal enquanto o loop roda, ex.: "zerar_chuva 3"
+COMANDOS_OPERADOR = {
+    "inverter_vento": lambda estacao, prioridade: inverter_direcao_vento(estacao, True, prioridade),
+    "normal_vento":   lambda estacao, prioridade: inverter_direcao_vento(estacao, False, prioridade),
+    "zerar_vento":    zerar_velocidade_vento,
+    "zerar_chuva":    zerar_chuva,
+}
+
+def ler_comandos_operador():
+    """Lê comandos do terminal (thread própria) e os coloca nas filas"""
+    for linha in sys.stdin:
+        partes = linha.split()
+        if not partes:
+            continue
+        # "!" no fim passa o comando na frente dos outros pendentes
+        prioridade = URGENTE if partes[-1] == "!" else NORMAL
+        if prioridade == URGENTE:
+            partes = partes[:-1]
+        if len(partes) != 2 or partes[0] not in COMANDOS_OPERADOR or not partes[1].isdigit():
+            print(f"⚠️ Uso: <{'|'.join(COMANDOS_OPERADOR)}> <id> [!]")
+            continue
+        try:
+            COMANDOS_OPERADOR[partes[0]](int(partes[1]), prioridade)
+        except ValueError as e:
+            print(f"⚠️ {e}")
 
 # ================================
-# FUNÇÃO DE ENVIO PARA API
+# ENVIO PARA API
 # ================================
-def enviar_para_api(nome, dados):
-    """Envia os dados formatados para o endpoint HTTP"""
-    try:
-        payload = {
-            "nome": nome,
-            "sensores": (
-                f"T:{dados['temperatura']:.1f}|"
-                f"H:{dados['umidade']:.1f}|"
-                f"P:{dados['pressao']:.1f}|"
-                f"R:{dados['ruido']:.1f}|"
-                f"L:{dados['iluminancia']:.1f}|"
-                f"CH:{dados['chuva']:.1f}|"
-                f"VV:{dados['vento_velocidade']:.1f}|"
-                f"DV:{dados['vento_direcao']:.1f}|"
-                f"PM25:{dados['pm25']:.0f}|"
-                f"PM10:{dados['pm10']:.0f}"
-            )
-        }
-
-        response = requests.post(ENDPOINT, json=payload, timeout=10)
-        if response.status_code == 200:
-            print(f"  ✅ Enviado para API: {payload['nome']}")
-        else:
-            print(f"  ⚠️ Falha ao enviar {payload['nome']} -> {response.status_code} {response.text}")
+# As leituras do ciclo (e o que ficou pendente de ciclos anteriores) vão
+# juntas num único POST em vez de um POST por estação, sobre uma sessão
+# keep-alive (pool do tamanho da frota). O envio roda numa thread própria:
+# a leitura só entrega as leituras numa fila limitada e segue o ciclo. Toda
+# leitura passa pela caixa de saída em disco (caixa_saida.db) e só sai de lá
+# quando a API confirma: com a API fora, nada se perde.
+N_ESTACOES = len(CODIGOS)
 
-    except Exception as e:
-        print(f"  ❌ Erro no envio para API: {e}")
+def criar_envio(ao_descartar=None):
+    enviador = EnviadorLotes(ENDPOINT, TAMANHO_LOTE, INTERVALO_ENVIO, sessao=criar_sessao(N_ESTACOES),
+                             formato=FORMATO_ENVIO, comprimir=COMPRIMIR_ENVIO, em_lote=ENVIO_EM_LOTE)
+    return EnvioEmSegundoPlano(enviador, TAMANHO_FILA, POLITICA_FILA, caixa=CaixaSaida(),
+                               vazao_maxima=VAZAO_REENVIO, ao_descartar=ao_descartar)
 
 # ================================
 # LOOP PRINCIPAL
 # ================================
-print("🚀 Iniciando leituras e envio a cada 60 segundos...\n")
-
-while True:
-    print(f"\n📡 Leitura: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    for estacao in ESTACOES:
-        dados = ler_estacao(estacao)
-
-        if "erro" in dados:
-            print(f"  Estação {estacao}: ⚠️ Erro -> {dados['erro']}")
-        else:
-            print(
-                f"  Estação {estacao}: "
-                f"T={dados['temperatura']:.1f}°C  "
-                f"H={dados['umidade']:.1f}%  "
-                f"P={dados['pressao']:.1f}hPa  "
-                f"R={dados['ruido']:.1f}dB  "
-                f"L={dados['iluminancia']} lx  "
-                f"CH={dados['chuva']:.1f} mm  "
-                f"VV={dados['vento_velocidade']:.1f} km/h  "
-                f"DV={dados['vento_direcao']:.1f}°  "
-                f"PM2.5={dados['pm25']} µg/m³  "
-                f"PM10={dados['pm10']} µg/m³"
-            )
-
-            enviar_para_api(f"Estação {estacao}", dados)
-
-    print("-" * 90)
-    time.sleep(60)
-
-    # Exemplo: comandos de calibração (pode chamar manualmente se quiser)
-    # inverter_direcao_vento(1, inverter=True)
-    # zerar_velocidade_vento(1)
-    # zerar_chuva(1)
+def main():
+    print(f"🚀 Iniciando leituras e envio a cada {INTERVALO_LEITURA} segundos...\n")
+    if sys.stdin.isatty():
+        print(f"⌨️ Comandos: <{'|'.join(COMANDOS_OPERADOR)}> <id> [!]  (! = urgente)\n")
+        threading.Thread(target=ler_comandos_operador, name="operador", daemon=True).start()
+    filtro = FiltroBandaMorta(silencio_maximo=SILENCIO_MAXIMO) if ENVIO_POR_EXCECAO else None
+    # Leitura descartada pela fila ou pela caixa: os sensores dela vão de novo na próxima
+    envio = criar_envio(filtro.descartadas if filtro else None)
+
+    while True:
+        print(f"\n📡 Leitura: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        inicio = time.monotonic()
+        resultados = ler_ciclo()
+        duracao = time.monotonic() - inicio
+
+        for chave, dados in resultados.items():
+            estacao = CODIGOS[chave]   # número da estação na API
+            if "erro" in dados:
+                print(f"  Estação {estacao}: ⚠️ Erro -> {dados['erro']}")
+                if filtro:
+                    filtro.esquecer(estacao)  # quando voltar, envia a leitura completa
+            else:
+                print(
+                    f"  Estação {estacao}: "
+                    f"T={dados['temperatura']:.1f}°C  "
+                    f"H={dados['umidade']:.1f}%  "
+                    f"P={dados['pressao']:.1f}hPa  "
+                    f"R={dados['ruido']:.1f}dB  "
+                    f"L={dados['iluminancia']} lx  "
+                    f"CH={dados['chuva']:.1f} mm  "
+                    f"VV={dados['vento_velocidade']:.1f} km/h  "
+                    f"DV={dados['vento_direcao']:.1f}°  "
+                    f"PM2.5={dados['pm25']} µg/m³  "
+                    f"PM10={dados['pm10']} µg/m³"
+                )
+
+                if filtro:
+                    dados = filtro.filtrar(estacao, dados)
+                # Só conta como enviado o que de fato entrou na fila de envio
+                if dados and envio.entregar(estacao, dados) and filtro:
+                    filtro.confirmar(estacao, dados)
+
+        print(f"  ⏱️ Ciclo de leitura: {duracao:.1f} s ({len(BARRAMENTOS)} barramento(s))")
+        for disjuntor in disjuntores.values():
+            if disjuntor.estado != FECHADO:
+                logging.info("Saúde estação %s: %s", disjuntor.nome, disjuntor.metricas())
+        logging.info("Envio: %s", envio.estatisticas())
+        if filtro:
+            logging.info("Envio por exceção: %s", filtro.estatisticas())
+        print("-" * 90)
+        aguardar_proximo_ciclo(time.monotonic() + INTERVALO_LEITURA)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from decodificador import DecodificadorBloco
+from disjuntor import Disjuntor
+from modbus_rtu import ErroModbus, SemResposta
+from plano_leitura import Bloco, compilar_plano
+
+logger = logging.getLogger(__name__)
+
+# Tempo de processamento do dispositivo entre requisição e resposta
+LATENCIA_DISPOSITIVO = 0.03  # segundos
+
+# Estação que não responde: depois de LIMITE_FALHAS ticks seguidos sem
+# resposta só é sondada após ESPERA_INICIAL, dobrando até ESPERA_MAXIMA
+LIMITE_FALHAS = 3
+ESPERA_INICIAL = 10    # segundos
+ESPERA_MAXIMA = 300    # segundos
+
+
+@dataclass(frozen=True)
+class Grupo:
+    """Conjunto de registradores lidos com o mesmo período"""
+    nome: str
+    periodo: float                 # segundos
+    sensores: Dict[str, tuple]     # {nome: (endereco, escala[, signed])}
+
+
+def custo_bloco(bloco: Bloco, baudrate: int) -> float:
+    """Tempo estimado de barramento de uma leitura FC03: requisição + resposta + latência"""
+    bytes_no_fio = 8 + 5 + 2 * bloco.quantidade
+    return bytes_no_fio * 11 / baudrate + LATENCIA_DISPOSITIVO
+
+
+class Agendador:
+    """
+    Agenda leituras com período por grupo de registradores.
+
+    A cada tick os grupos vencidos de uma estação são juntados num plano de
+    blocos FC03 compartilhados. As transações são executadas da mais atrasada
+    para a menos atrasada até gastar `orcamento` (fração do tick) de tempo de
+    barramento; o que sobra fica para o próximo tick.
+
+    O orçamento é debitado pelo tempo medido de cada estação (timeouts
+    inclusos), não pelo tempo estimado no fio, e o timeout da porta é
+    encurtado para o que resta do orçamento. Uma estação que não responde
+    custa no máximo um timeout por tick e, com o disjuntor dela aberto, só
+    é sondada de tempos em tempos.
+
+    As respostas vão para um DecodificadorBloco por bloco (uma linha por
+    estação) e cada bloco é decodificado uma vez por tick, para todas as
+    estações que o leram.
+    """
+
+    def __init__(self, estacoes: List[int], grupos: List[Grupo], baudrate: int = 4800,
+                 orcamento: float = 0.7, max_lacuna: int = 0, limite_falhas: int = LIMITE_FALHAS,
+                 espera_inicial: float = ESPERA_INICIAL, espera_maxima: float = ESPERA_MAXIMA,
+                 relogio=time.monotonic):
+        self.estacoes = list(estacoes)
+        self.grupos = {g.nome: g for g in grupos}
+        self.baudrate = baudrate
+        self.orcamento = orcamento
+        self.max_lacuna = max_lacuna
+        self.relogio = relogio
+        # O tick é o menor período: nenhum grupo precisa de resolução maior
+        self.tick = min(g.periodo for g in grupos)
+        agora = relogio()
+        self.proxima: Dict[Tuple[int, str], float] = {(e, g.nome): agora for e in self.estacoes for g in grupos}
+        self._planos: Dict[FrozenSet[str], List[Bloco]] = {}
+        self._decodificadores: Dict[Bloco, DecodificadorBloco] = {}
+        self._linha = {e: i for i, e in enumerate(self.estacoes)}
+        self.disjuntores = {e: Disjuntor(str(e), limite_falhas, espera_inicial, espera_maxima, relogio)
+                            for e in self.estacoes}
+        # Último tempo medido de cada (estação, grupos): vale mais que a estimativa se for maior
+        self._medido: Dict[Tuple[int, FrozenSet[str]], float] = {}
+        self.tempo_ocupado = 0.0
+        self.adiadas = 0
+        self.puladas = 0
+
+    def plano_para(self, nomes: FrozenSet[str]) -> List[Bloco]:
+        """Plano de blocos para uma combinação de grupos (compilado uma vez e guardado)"""
+        if nomes not in self._planos:
+            sensores = {}
+            for nome in sorted(nomes):
+                sensores.update(self.grupos[nome].sensores)
+            self._planos[nomes] = compilar_plano(sensores, max_lacuna=self.max_lacuna)
+        return self._planos[nomes]
+
+    def decodificador_para(self, bloco: Bloco) -> DecodificadorBloco:
+        """Decodificador do bloco com uma linha por estação (criado uma vez e guardado)"""
+        if bloco not in self._decodificadores:
+            # Sem campos combinados: as chaves de saída são os sensores dos grupos
+            self._decodificadores[bloco] = DecodificadorBloco(bloco, len(self.estacoes), combinados={})
+        return self._decodificadores[bloco]
+
+    def vencidos(self, agora: float) -> Dict[int, FrozenSet[str]]:
+        """Grupos vencidos por estação"""
+        pendentes = {}
+        for (estacao, nome), instante in self.proxima.items():
+            if instante <= agora:
+                pendentes.setdefault(estacao, set()).add(nome)
+        return {estacao: frozenset(nomes) for estacao, nomes in pendentes.items()}
+
+    def _atraso(self, estacao: int, nomes: FrozenSet[str], agora: float) -> float:
+        """Atraso relativo ao período do grupo mais urgente (maior = mais urgente)"""
+        return max((agora - self.proxima[(estacao, n)]) / self.grupos[n].periodo for n in nomes)
+
+    def _reagendar(self, estacao: int, nomes: FrozenSet[str], agora: float):
+        for nome in nomes:
+            # Mantém a fase do período; se ficou para trás, recomeça a partir de agora
+            chave = (estacao, nome)
+            periodo = self.grupos[nome].periodo
+            proxima = self.proxima[chave] + periodo
+            self.proxima[chave] = proxima if proxima > agora else agora + periodo
+
+    def _ler_plano(self, ser, estacao: int, plano: List[Bloco]) -> List[Bloco]:
+        """
+        Lê os blocos do plano para a linha da estação nos decodificadores e
+        devolve os que foram lidos; para no primeiro sem resposta (não paga
+        um timeout por bloco).
+        """
+        lidos = []
+        for bloco in plano:
+            try:
+                self.decodificador_para(bloco).ler(ser, estacao, self._linha[estacao])
+                lidos.append(bloco)
+            except SemResposta as e:
+                logger.warning("Estação %s, bloco 0x%03X+%d: %s", estacao, bloco.inicio, bloco.quantidade, e)
+                break
+            except ErroModbus as e:
+                logger.warning("Estação %s, bloco 0x%03X+%d: %s", estacao, bloco.inicio, bloco.quantidade, e)
+        return lidos
+
+    def _decodificar(self, leituras: Dict[int, Dict[str, Optional[float]]], lidos: Dict[int, List[Bloco]]):
+        """Decodifica cada bloco uma vez e preenche os valores das estações que o leram neste tick"""
+        por_bloco: Dict[Bloco, List[int]] = {}
+        for estacao, blocos in lidos.items():
+            for bloco in blocos:
+                por_bloco.setdefault(bloco, []).append(estacao)
+        for bloco, estacoes in por_bloco.items():
+            decodificador = self._decodificadores[bloco]
+            saida = decodificador.decodificar()
+            for estacao in estacoes:
+                leituras[estacao].update(zip(decodificador.nomes, saida[self._linha[estacao]].tolist()))
+
+    def executar_tick(self, ser) -> Dict[int, Dict[str, Optional[float]]]:
+        """Executa as leituras vencidas dentro do orçamento e devolve {estacao: {sensor: valor}}"""
+        agora = self.relogio()
+        limite = self.orcamento * self.tick
+        gasto = 0.0
+        leituras = {}
+        lidos = {}
+        fila = sorted(self.vencidos(agora).items(), key=lambda item: -self._atraso(item[0], item[1], agora))
+        for estacao, nomes in fila:
+            disjuntor = self.disjuntores[estacao]
+            if disjuntor.acao() is None:
+                # Estação fora: não gasta barramento até a próxima sonda
+                self.puladas += 1
+                self._reagendar(estacao, nomes, agora)
+                continue
+            plano = self.plano_para(nomes)
+            estimado = sum(custo_bloco(b, self.baudrate) for b in plano)
+            custo = max(estimado, self._medido.get((estacao, nomes), 0.0))
+            if gasto + custo > limite and gasto > 0:
+                self.adiadas += 1
+                continue  # fica vencido: entra no próximo tick
+            # Espera por resposta limitada ao que resta do orçamento (com folga sobre o estimado)
+            timeout_porta = ser.timeout
+            ser.timeout = min(timeout_porta, max(limite - gasto, 2 * estimado))
+            inicio = self.relogio()
+            try:
+                lidos[estacao] = self._ler_plano(ser, estacao, plano)
+            finally:
+                ser.timeout = timeout_porta
+            decorrido = self.relogio() - inicio
+            gasto += decorrido
+            if lidos[estacao]:
+                disjuntor.registrar_sucesso(decorrido)
+                self._medido[(estacao, nomes)] = decorrido
+            else:
+                disjuntor.registrar_falha()
+            # Blocos que falharam ficam como None
+            leituras[estacao] = {c.nome: None for b in plano for c in b.campos}
+            self._reagendar(estacao, nomes, agora)
+        self._decodificar(leituras, lidos)
+        self.tempo_ocupado += gasto
+        return leituras
+
+    def executar(self, ser, ao_ler: Callable[[Dict[int, Dict[str, Optional[float]]]], None]):
+        """Loop principal: um tick por vez, chamando `ao_ler` com o que foi lido"""
+        inicio = self.relogio()
+        while True:
+            comeco_tick = self.relogio()
+            leituras = self.executar_tick(ser)
+            if leituras:
+                ao_ler(leituras)
+            decorrido = self.relogio() - inicio
+            logger.debug("Uso do barramento: %.0f%% (%d transação(ões) adiadas, %d de estações fora)",
+                         100 * self.tempo_ocupado / max(decorrido, 1e-9), self.adiadas, self.puladas)
+            time.sleep(max(0.0, self.tick - (self.relogio() - comeco_tick)))
@@ -0,0 +1,120 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Banda:
+    """Variação mínima para um sensor ser reenviado (a maior das duas vale)"""
+    absoluta: float = 0.0
+    percentual: float = 0.0     # % do último valor enviado
+    circular: float = 0.0       # período de grandezas angulares (360 para direção do vento)
+
+    def cruzou(self, anterior: float, atual: float) -> bool:
+        diferenca = abs(atual - anterior)
+        if self.circular:
+            diferenca = min(diferenca, self.circular - diferenca)
+        limite = max(self.absoluta, abs(anterior) * self.percentual / 100)
+        return diferenca >= limite if limite > 0 else diferenca > 0
+
+
+# Bandas padrão dos campos de ler_estacao (Station_compart_v1.4)
+BANDAS = {
+    "temperatura":      Banda(absoluta=0.2),
+    "umidade":          Banda(absoluta=1.0),
+    "pressao":          Banda(absoluta=1.0),            # hPa
+    "ruido":            Banda(absoluta=2.0),
+    "iluminancia":      Banda(absoluta=10, percentual=5),
+    "chuva":            Banda(),                        # qualquer variação
+    "vento_velocidade": Banda(absoluta=1.0),            # km/h
+    "vento_direcao":    Banda(absoluta=10, circular=360),
+    "pm25":             Banda(absoluta=2, percentual=5),
+    "pm10":             Banda(absoluta=2, percentual=5),
+}
+
+# Mesmo parado, cada sensor é reenviado pelo menos a cada SILENCIO_MAXIMO
+SILENCIO_MAXIMO = 15 * 60  # segundos
+
+
+class FiltroBandaMorta:
+    """
+    Envio por exceção: de cada leitura só seguem os sensores que saíram da
+    banda em torno do último valor *enviado* (não do último lido, para o
+    erro não acumular) ou que estão calados há `silencio_maximo`.
+
+    O servidor reconstrói a visão completa mantendo, por estação, o último
+    valor recebido de cada sensor (ver `reconstruir`): nenhum valor fica
+    mais longe do real do que a banda dele. Isso exige que o storeOrUpdate
+    mescle os sensores recebidos no registro existente em vez de substituí-lo.
+
+    `filtrar` não registra nada: só depois que a leitura entrou na fila de
+    envio `confirmar` marca os valores como enviados. Uma leitura descartada
+    depois disso (fila ou caixa cheia) deve voltar com `esquecer`, para os
+    sensores dela irem de novo na próxima leitura.
+    """
+
+    def __init__(self, bandas: Dict[str, Banda] = BANDAS, silencio_maximo: float = SILENCIO_MAXIMO,
+                 relogio=time.monotonic):
+        self.bandas = bandas
+        self.silencio_maximo = silencio_maximo
+        self.relogio = relogio
+        self._enviados: Dict[Tuple[int, str], Tuple[float, float]] = {}   # (estação, campo) → (valor, instante)
+        self._trava = threading.Lock()   # esquecer() vem da thread de envio
+        self.valores_lidos = 0
+        self.valores_enviados = 0
+
+    def filtrar(self, estacao: int, dados: Dict[str, float]) -> Optional[Dict[str, float]]:
+        """Sensores da leitura que devem ser enviados (None se nenhum); não registra nada"""
+        agora = self.relogio()
+        saida = {}
+        with self._trava:
+            for campo, valor in dados.items():
+                anterior = self._enviados.get((estacao, campo))
+                banda = self.bandas.get(campo)
+                if (anterior is None or banda is None or agora - anterior[1] >= self.silencio_maximo
+                        or banda.cruzou(anterior[0], valor)):
+                    saida[campo] = valor
+            self.valores_lidos += len(dados)
+        return saida or None
+
+    def confirmar(self, estacao: int, dados: Dict[str, float]):
+        """Registra os sensores como enviados (chamar quando a leitura entrou na fila de envio)"""
+        agora = self.relogio()
+        with self._trava:
+            for campo, valor in dados.items():
+                self._enviados[(estacao, campo)] = (valor, agora)
+            self.valores_enviados += len(dados)
+
+    def esquecer(self, estacao: int, campos: Optional[Iterable[str]] = None):
+        """
+        Força o envio dos `campos` (todos, se None) da estação na próxima
+        leitura: depois de uma falha de leitura ou de uma leitura descartada.
+        """
+        with self._trava:
+            if campos is None:
+                chaves = [c for c in self._enviados if c[0] == estacao]
+            else:
+                chaves = [(estacao, campo) for campo in campos]
+            for chave in chaves:
+                self._enviados.pop(chave, None)
+
+    def descartadas(self, leituras):
+        """Callback para EnvioEmSegundoPlano(ao_descartar=...): reenvia o que se perdeu"""
+        for leitura in leituras:
+            self.esquecer(leitura["estacao"], leitura["dados"])
+
+    def estatisticas(self) -> Dict[str, float]:
+        return {
+            "valores_lidos": self.valores_lidos,
+            "valores_enviados": self.valores_enviados,
+            "reducao": 1 - self.valores_enviados / self.valores_lidos if self.valores_lidos else 0.0,
+        }
+
+
+def reconstruir(leituras, estado: Optional[Dict[int, Dict[str, float]]] = None) -> Dict[int, Dict[str, float]]:
+    """Lado do servidor: aplica leituras parciais {"estacao", "dados"} sobre o último estado conhecido"""
+    estado = {} if estado is None else estado
+    for leitura in leituras:
+        estado.setdefault(leitura["estacao"], {}).update(leitura["dados"])
+    return estado
@@ -0,0 +1,123 @@
+import argparse
+import time
+
+import serial
+
+from modbus_rtu import BAUDRATES_SUPORTADOS, ErroModbus, detectar_baudrate, escrever_registro, ler_registros
+from registro_estacoes import CODIGOS_BAUDRATE, carregar_registro, salvar_registro
+
+# Porta serial
+PORTA = "COM15"
+TIMEOUT = 1
+
+REGISTER_ADDR = 0x07D1  # Endereço do registrador de baud rate
+
+# Tempo para os dispositivos passarem a usar o novo baud rate
+ESPERA_TROCA_BAUD = 0.5  # segundos
+
+
+def migrar(ser, slave_ids, novo_baudrate):
+    """
+    Troca o baud rate de todos os escravos do barramento e confere cada um no
+    novo baud rate. Devolve {slave_id: (ok, detalhe, duração)}.
+    """
+    codigo = {b: c for c, b in CODIGOS_BAUDRATE.items()}[novo_baudrate]
+    resultados = {}
+
+    # 1) Escreve 0x07D1 em todos, ainda no baud rate atual (o eco vem no antigo)
+    for slave_id in slave_ids:
+        inicio = time.perf_counter()
+        try:
+            escrever_registro(ser, slave_id, REGISTER_ADDR, codigo)
+            resultados[slave_id] = (True, "escrito", time.perf_counter() - inicio)
+        except ErroModbus as e:
+            resultados[slave_id] = (False, f"escrita falhou: {e}", time.perf_counter() - inicio)
+
+    # 2) Passa a porta para o novo baud rate e lê o registrador de volta
+    time.sleep(ESPERA_TROCA_BAUD)
+    ser.baudrate = novo_baudrate
+    for slave_id in slave_ids:
+        ok, detalhe, duracao = resultados[slave_id]
+        if not ok:
+            continue
+        inicio = time.perf_counter()
+        try:
+            lido = ler_registros(ser, slave_id, REGISTER_ADDR, 1)[0]
+            ok = lido == codigo
+            detalhe = f"ok @ {novo_baudrate}" if ok else f"lido código {lido}, esperado {codigo}"
+        except ErroModbus as e:
+            ok, detalhe = False, f"sem confirmação @ {novo_baudrate}: {e}"
+        resultados[slave_id] = (ok, detalhe, duracao + time.perf_counter() - inicio)
+    return resultados
+
+
+def localizar(ser, slave_ids, alvo):
+    """
+    Baud rate em que cada escravo responde agora ({baud: [ids]}; None = nenhum).
+    Sonda cada um primeiro no `alvo`: depois de uma migração interrompida o
+    barramento fica dividido e cada estação tem de ser achada onde estiver.
+    """
+    candidatos = (alvo,) + tuple(b for b in BAUDRATES_SUPORTADOS if b != alvo)
+    grupos = {}
+    for slave_id in slave_ids:
+        grupos.setdefault(detectar_baudrate(ser, [slave_id], candidatos), []).append(slave_id)
+    return grupos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra o baud rate das estações de um barramento")
+    parser.add_argument("--porta", default=PORTA)
+    parser.add_argument("--para", type=int, default=max(BAUDRATES_SUPORTADOS), choices=BAUDRATES_SUPORTADOS)
+    parser.add_argument("--ids", help="IDs separados por vírgula (padrão: registro de estações)")
+    args = parser.parse_args()
+
+    registro = carregar_registro()
+    if args.ids:
+        slave_ids = [int(i) for i in args.ids.split(",")]
+    else:
+        slave_ids = [e["id"] for e in registro.get(args.porta, {}).get("estacoes", [])]
+    if not slave_ids:
+        print("❌ Nenhuma estação conhecida: rode Id_Station.py ou informe --ids.")
+        return
+
+    with serial.Serial(port=args.porta, bytesize=8, parity="N", stopbits=1, timeout=TIMEOUT) as ser:
+        grupos = localizar(ser, slave_ids, args.para)
+        sem_resposta = grupos.pop(None, [])
+        if not grupos:
+            print(f"❌ Nenhuma estação respondeu em {BAUDRATES_SUPORTADOS} baud.")
+            return
+        for baudrate, ids in sorted(grupos.items()):
+            print(f"🔎 {args.porta}: estação(ões) {ids} em {baudrate} baud")
+        ja_migradas = grupos.pop(args.para, [])
+        resultados = {slave_id: (True, f"já em {args.para}", 0.0) for slave_id in ja_migradas}
+        resultados.update({slave_id: (False, "não respondeu em nenhum baud rate", 0.0) for slave_id in sem_resposta})
+        if not grupos and not sem_resposta:
+            print("✅ Nada a fazer.")
+            return
+
+        # Cada grupo é migrado a partir do baud rate em que está
+        for atual, ids in sorted(grupos.items()):
+            print(f"🔧 Migrando {len(ids)} estação(ões) de {atual} para {args.para} baud...")
+            ser.baudrate = atual
+            resultados.update(migrar(ser, ids, args.para))
+
+    for slave_id, (ok, detalhe, duracao) in sorted(resultados.items()):
+        print(f"  {'✅' if ok else '❌'} Estação {slave_id:3d} ({duracao * 1e3:6.0f} ms): {detalhe}")
+
+    if all(ok for ok, _, _ in resultados.values()):
+        if args.porta in registro:
+            registro[args.porta]["baudrate"] = args.para
+            for estacao in registro[args.porta]["estacoes"]:
+                estacao["baudrate"] = args.para
+            salvar_registro(registro)
+        print(f"✅ Barramento {args.porta} migrado para {args.para} baud.")
+    else:
+        # Estações em baud rates diferentes não podem dividir o barramento. Rodar
+        # de novo acha cada estação onde ela estiver (primeiro no baud rate alvo)
+        anteriores = ", ".join(str(b) for b in sorted(grupos)) or "?"
+        print(f"⚠️ Barramento dividido: rode novamente com --para {args.para} para completar, "
+              f"ou com --para <{anteriores}> para desfazer.")
+
+
+if __name__ == "__main__":
+    main()
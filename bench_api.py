@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+import requests
+
+from busca_estacoes import OK, SITUACAO, BuscadorEstacoes
+from envio_api import EnviadorLotes, criar_sessao, montar_payload, nova_leitura
+from medicao import percentil, revisao_git
+from simulador_iothub import SimuladorIotHub
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+DADOS_EXEMPLO = {
+    "temperatura": 23.4, "umidade": 55.0, "pressao": 1013.0, "ruido": 42.1, "iluminancia": 12000,
+    "chuva": 0.0, "vento_velocidade": 7.2, "vento_direcao": 180, "pm25": 12, "pm10": 20,
+}
+
+
+# ================================
+# ENVIO (storeOrUpdate)
+# ================================
+# Cada caminho recebe a URL base e devolve uma função ciclo(estacoes) -> leituras aceitas
+
+def envio_por_estacao(url_base):
+    """Um requests.post por estação, sem sessão (enviar_para_api original)"""
+    endpoint = f"{url_base}/estacoes_mets/storeOrUpdate"
+
+    def ciclo(estacoes):
+        aceitas = 0
+        for estacao in estacoes:
+            try:
+                r = requests.post(endpoint, json=montar_payload(f"Estação {estacao}", DADOS_EXEMPLO), timeout=10)
+                aceitas += r.status_code == 200
+            except requests.RequestException:
+                pass
+        return aceitas
+    return ciclo
+
+
+def envio_keepalive(url_base):
+    """EnviadorLotes padrão: um objeto por POST, sessão keep-alive"""
+    enviador = EnviadorLotes(f"{url_base}/estacoes_mets/storeOrUpdate", sessao=criar_sessao(1))
+
+    def ciclo(estacoes):
+        for estacao in estacoes:
+            enviador.adicionar(nova_leitura(estacao, DADOS_EXEMPLO))
+        return enviador.enviar(forcar=True)
+    return ciclo
+
+
+def envio_lotes(url_base):
+    """EnviadorLotes: o ciclo inteiro num POST, sessão keep-alive"""
+    enviador = EnviadorLotes(f"{url_base}/estacoes_mets/storeOrUpdate", sessao=criar_sessao(1), em_lote=True)
+
+    def ciclo(estacoes):
+        for estacao in estacoes:
+            enviador.adicionar(nova_leitura(estacao, DADOS_EXEMPLO))
+        return enviador.enviar(forcar=True)
+    return ciclo
+
+
+CAMINHOS_ENVIO = {
+    "por_estacao": envio_por_estacao,
+    "keepalive": envio_keepalive,
+    "lotes": envio_lotes,
+}
+
+
+# ================================
+# DASHBOARD (estacoes_mets/{id})
+# ================================
+# Cada caminho recebe a lista de URLs e devolve uma função busca() -> linhas obtidas
+
+def busca_sequencial(urls):
+    """Laço de get_estacoes_data (deploy_Station1.py): um GET por vez"""
+    def busca():
+        linhas = []
+        for url in urls:
+            try:
+                response = requests.get(url, timeout=5)
+                if response.status_code == 200:
+                    linhas.append(response.json().get("arrResponse", {}))
+            except requests.RequestException:
+                pass
+        return linhas
+    return busca
+
+
+def busca_paralela(urls):
+    """BuscadorEstacoes (deploy_Station1.py): GETs simultâneos com prazo total"""
+    buscador = BuscadorEstacoes(urls)
+
+    def busca():
+        linhas, _ = buscador.buscar()
+        return [linha for linha in linhas if linha[SITUACAO] == OK]
+    return busca
+
+
+CAMINHOS_BUSCA = {
+    "sequencial": busca_sequencial,
+    "paralela": busca_paralela,
+}
+
+
+# ================================
+# MEDIÇÃO
+# ================================
+def resumir(nome, tempos, itens, pedidos, contadores):
+    total = sum(tempos)
+    return {
+        "caminho": nome,
+        "repeticoes": len(tempos),
+        "itens_por_s": itens / total,
+        "p50_s": statistics.median(tempos),
+        "p99_s": percentil(tempos, 99),
+        "itens_ok": itens,
+        "itens_pedidos": pedidos,
+        "requisicoes_http": contadores["get"] + contadores["post"],
+    }
+
+
+def medir(tipo, nome, n_estacoes, repeticoes, latencia, taxa_erro, taxa_travamento):
+    """Roda um caminho `repeticoes` vezes contra um IoT Hub simulado novo"""
+    simulador = SimuladorIotHub(n_estacoes, latencia, taxa_erro=taxa_erro,
+                                taxa_travamento=taxa_travamento, travamento=6)
+    url_base = simulador.iniciar()
+    estacoes = list(range(1, n_estacoes + 1))
+    if tipo == "envio":
+        executar = CAMINHOS_ENVIO[nome](url_base)
+        rodada = lambda: executar(estacoes)
+    else:
+        rodada = CAMINHOS_BUSCA[nome]([f"{url_base}/estacoes_mets/{i}" for i in estacoes])
+    tempos = []
+    itens = 0
+    try:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = rodada()
+            tempos.append(time.perf_counter() - inicio)
+            itens += resultado if isinstance(resultado, int) else len(resultado)
+    finally:
+        simulador.parar()
+    return resumir(f"{tipo}:{nome}", tempos, itens, n_estacoes * repeticoes, simulador.contadores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do envio e do dashboard contra o IoT Hub simulado")
+    parser.add_argument("--envio", default=",".join(CAMINHOS_ENVIO), help="caminhos de envio ('' = nenhum)")
+    parser.add_argument("--busca", default=",".join(CAMINHOS_BUSCA), help="caminhos do dashboard ('' = nenhum)")
+    parser.add_argument("--estacoes", type=int, default=12)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--latencia", type=float, default=0.05, help="latência de cada resposta da API (s)")
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--taxa-travamento", type=float, default=0.0, help="respostas que demoram 6 s")
+    parser.add_argument("--saida", default=os.path.join(PASTA, "bench_api.json"))
+    args = parser.parse_args()
+
+    resultados = []
+    rodadas = [("envio", n) for n in filter(None, args.envio.split(","))]
+    rodadas += [("busca", n) for n in filter(None, args.busca.split(","))]
+    for tipo, nome in rodadas:
+        r = medir(tipo, nome, args.estacoes, args.repeticoes, args.latencia, args.taxa_erro, args.taxa_travamento)
+        resultados.append(r)
+        print(f"📊 {r['caminho']:<20} {r['itens_por_s']:8.1f} estações/s  p50={r['p50_s'] * 1e3:7.0f} ms  "
+              f"p99={r['p99_s'] * 1e3:7.0f} ms  ok={r['itens_ok']}/{r['itens_pedidos']}  "
+              f"http={r['requisicoes_http']}")
+
+    relatorio = {
+        "revisao": revisao_git(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {"estacoes": args.estacoes, "repeticoes": args.repeticoes, "latencia": args.latencia,
+                       "taxa_erro": args.taxa_erro, "taxa_travamento": args.taxa_travamento},
+        "resultados": resultados,
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
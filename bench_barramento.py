@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+import serial
+
+from decodificador import DecodificadorBloco
+from medicao import percentil, revisao_git
+from modbus_async import abrir_mestre
+from modbus_rtu import ErroModbus, SemResposta
+from plano_leitura import compilar_plano, ler_bloco
+from simulador_estacao import SimuladorBarramento
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+# Mapa completo 0x1F4–0x201 + 0x204 (o mesmo de Station_02_v1.3_realTime.py)
+SENSORES = {
+    "Wind speed (m/s)":        (0x1F4, 0.01, False),
+    "Wind strength":           (0x1F5, 1, False),
+    "Wind direction (0-7)":    (0x1F6, 1, False),
+    "Wind direction (°)":      (0x1F7, 1, False),
+    "Humidity (%)":            (0x1F8, 0.1, False),
+    "Temperature (°C)":        (0x1F9, 0.1, True),
+    "Noise (dB)":              (0x1FA, 0.1, False),
+    "PM2.5 (µg/m3)":           (0x1FB, 1, False),
+    "PM10 (µg/m3)":            (0x1FC, 1, False),
+    "Pressure (kPa)":          (0x1FD, 0.1, False),
+    "Illuminance High":        (0x1FE, 1, False),
+    "Illuminance Low":         (0x1FF, 1, False),
+    "Illuminance Extra":       (0x200, 100, False),
+    "Rainfall (mm)":           (0x201, 0.1, False),
+    "Solar irradiance (W/m²)": (0x204, 1, True),
+}
+
+
+def carregar_script(nome_arquivo, nome_modulo):
+    """Importa um script do repositório cujo nome tem pontos (ex.: Station_compart_v1.4.py)"""
+    spec = importlib.util.spec_from_file_location(nome_modulo, os.path.join(PASTA, nome_arquivo))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+# ================================
+# CAMINHOS DE AQUISIÇÃO
+# ================================
+# Cada caminho recebe a porta e devolve uma função ciclo(estacoes) -> (timeouts, erros)
+# e uma função para fechar o que foi aberto.
+
+def caminho_por_registro(porta, baudrate):
+    """Um FC03 por registrador (ler_registro de Station_02_v1.2 / teste.py)"""
+    ser = serial.Serial(port=porta, baudrate=baudrate, timeout=1)
+    plano = compilar_plano(SENSORES, max_registros=1)
+    return _ciclo_plano(ser, plano), ser.close
+
+
+def caminho_blocos(porta, baudrate):
+    """Leitura em blocos (plano_leitura, Station_02_v1.3)"""
+    ser = serial.Serial(port=porta, baudrate=baudrate, timeout=1)
+    plano = compilar_plano(SENSORES)
+    return _ciclo_plano(ser, plano), ser.close
+
+
+def _ciclo_plano(ser, plano):
+    def ciclo(estacoes):
+        timeouts = erros = 0
+        for estacao in estacoes:
+            for bloco in plano:
+                try:
+                    ler_bloco(ser, estacao, bloco)
+                except SemResposta:
+                    timeouts += 1
+                except ErroModbus:
+                    erros += 1
+        return timeouts, erros
+    return ciclo
+
+
+def caminho_blocos_numpy(porta, baudrate):
+    """Leitura em blocos com decodificação vetorizada (decodificador.py)"""
+    ser = serial.Serial(port=porta, baudrate=baudrate, timeout=1)
+    plano = compilar_plano(SENSORES)
+    decodificadores = {}
+
+    def ciclo(estacoes):
+        timeouts = erros = 0
+        for bloco in plano:
+            if bloco not in decodificadores:
+                decodificadores[bloco] = DecodificadorBloco(bloco, len(estacoes))
+            decodificador = decodificadores[bloco]
+            for linha, estacao in enumerate(estacoes):
+                try:
+                    decodificador.ler(ser, estacao, linha)
+                except SemResposta:
+                    timeouts += 1
+                except ErroModbus:
+                    erros += 1
+            decodificador.decodificar()
+        return timeouts, erros
+    return ciclo, ser.close
+
+
+def caminho_minimalmodbus(porta, baudrate):
+    """ler_estacao de Station_compart_v1.4 (minimalmodbus, um registrador por vez)"""
+    script = carregar_script("Station_compart_v1.4.py", "station_compart_v1_4")
+    script.BAUDRATE = baudrate
+    instrument = script.criar_instrumento(porta)
+
+    def ciclo(estacoes):
+        timeouts = erros = 0
+        for estacao in estacoes:
+            dados = script.ler_estacao(instrument, estacao)
+            if "erro" in dados:
+                if "No communication" in dados["erro"]:
+                    timeouts += 1
+                else:
+                    erros += 1
+        return timeouts, erros
+    return ciclo, instrument.serial.close
+
+
+def caminho_asyncio(porta, baudrate):
+    """Mestre asyncio (modbus_async), blocos do plano_leitura"""
+    loop = asyncio.new_event_loop()
+    mestre = loop.run_until_complete(abrir_mestre(porta, baudrate))
+    plano = compilar_plano(SENSORES)
+
+    async def ler_todas(estacoes):
+        timeouts = erros = 0
+        for estacao in estacoes:
+            for bloco in plano:
+                try:
+                    await mestre.read_registers(estacao, bloco.inicio, bloco.quantidade)
+                except SemResposta:
+                    timeouts += 1
+                except ErroModbus:
+                    erros += 1
+        return timeouts, erros
+
+    def fechar():
+        mestre.close()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+
+    return (lambda estacoes: loop.run_until_complete(ler_todas(estacoes))), fechar
+
+
+CAMINHOS = {
+    "por_registro": caminho_por_registro,
+    "blocos": caminho_blocos,
+    "blocos_numpy": caminho_blocos_numpy,
+    "minimalmodbus": caminho_minimalmodbus,
+    "asyncio": caminho_asyncio,
+}
+
+
+# ================================
+# MEDIÇÃO
+# ================================
+def medir(nome, estacoes, ciclos, baudrate, latencia, taxa_erro):
+    """Roda `ciclos` ciclos completos de um caminho contra um simulador novo"""
+    simulador = SimuladorBarramento(estacoes, baudrate, latencia, taxa_erro)
+    porta = simulador.iniciar()
+    ciclo, fechar = CAMINHOS[nome](porta, baudrate)
+    tempos = []
+    timeouts = erros = 0
+    try:
+        for _ in range(ciclos):
+            inicio = time.perf_counter()
+            t, e = ciclo(estacoes)
+            tempos.append(time.perf_counter() - inicio)
+            timeouts += t
+            erros += e
+    finally:
+        fechar()
+        simulador.parar()
+
+    total = sum(tempos)
+    return {
+        "caminho": nome,
+        "ciclos": ciclos,
+        "estacoes_por_s": len(estacoes) * ciclos / total,
+        "ciclo_p50_s": statistics.median(tempos),
+        "ciclo_p99_s": percentil(tempos, 99),
+        "timeouts": timeouts,
+        "erros": erros,
+        "bytes_no_fio": simulador.contadores["bytes_rx"] + simulador.contadores["bytes_tx"],
+        "requisicoes": simulador.contadores["requisicoes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos de aquisição contra o simulador RS485")
+    parser.add_argument("--caminhos", default=",".join(CAMINHOS), help="lista separada por vírgula")
+    parser.add_argument("--estacoes", type=int, default=5)
+    parser.add_argument("--ciclos", type=int, default=10)
+    parser.add_argument("--baudrate", type=int, default=4800)
+    parser.add_argument("--latencia", type=float, default=0.02, help="tempo de resposta do escravo simulado (s)")
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--saida", default=os.path.join(PASTA, "bench_barramento.json"))
+    args = parser.parse_args()
+
+    estacoes = list(range(1, args.estacoes + 1))
+    resultados = []
+    for nome in args.caminhos.split(","):
+        r = medir(nome, estacoes, args.ciclos, args.baudrate, args.latencia, args.taxa_erro)
+        resultados.append(r)
+        print(f"📊 {nome:<14} {r['estacoes_por_s']:7.2f} estações/s  "
+              f"p50={r['ciclo_p50_s'] * 1e3:7.0f} ms  p99={r['ciclo_p99_s'] * 1e3:7.0f} ms  "
+              f"timeouts={r['timeouts']}  erros={r['erros']}  bytes={r['bytes_no_fio']}")
+
+    relatorio = {
+        "revisao": revisao_git(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {"estacoes": args.estacoes, "ciclos": args.ciclos, "baudrate": args.baudrate,
+                       "latencia": args.latencia, "taxa_erro": args.taxa_erro},
+        "resultados": resultados,
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import random
+import time
+
+from modbus_rtu import calcular_crc, montar_comando
+
+# Quantidade de frames usados no benchmark
+N_FRAMES = 5000
+REPETICOES = 5
+
+
+# Implementação antiga (bit a bit), copiada dos scripts originais para comparação
+def calcular_crc_bit_a_bit(data: bytes) -> bytes:
+    crc = 0xFFFF
+    for pos in data:
+        crc ^= pos
+        for _ in range(8):
+            if crc & 1:
+                crc >>= 1
+                crc ^= 0xA001
+            else:
+                crc >>= 1
+    return crc.to_bytes(2, byteorder="little")
+
+
+def montar_comando_antigo(slave_id: int, addr: int, qtd: int = 1) -> bytes:
+    msg = bytearray()
+    msg.append(slave_id)
+    msg.append(0x03)
+    msg.append((addr >> 8) & 0xFF)
+    msg.append(addr & 0xFF)
+    msg.append(0x00)
+    msg.append(qtd)
+    msg.extend(calcular_crc_bit_a_bit(msg))
+    return bytes(msg)
+
+
+def cronometrar(funcao, argumentos):
+    """Melhor tempo (s) entre REPETICOES passadas sobre todos os argumentos"""
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        for arg in argumentos:
+            funcao(*arg)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    rnd = random.Random(0)
+
+    # Respostas FC03 de 1 a 15 registradores, como as que chegam do barramento
+    frames = [bytes(rnd.getrandbits(8) for _ in range(3 + 2 * rnd.randint(1, 15))) for _ in range(N_FRAMES)]
+    for frame in frames:
+        assert calcular_crc(frame) == calcular_crc_bit_a_bit(frame)
+
+    # Comandos do ciclo de leitura: 5 estações x 15 registradores
+    comandos = [(slave, addr, 1) for slave in range(1, 6) for addr in range(0x1F4, 0x203)]
+    comandos = comandos * (N_FRAMES // len(comandos))
+
+    t_bit = cronometrar(calcular_crc_bit_a_bit, [(f,) for f in frames])
+    t_tab = cronometrar(calcular_crc, [(f,) for f in frames])
+    t_cmd_antigo = cronometrar(montar_comando_antigo, comandos)
+    t_cmd_cache = cronometrar(montar_comando, comandos)
+
+    print(f"📊 CRC16 em {len(frames)} frames")
+    print(f"  bit a bit : {t_bit * 1e3:8.2f} ms  ({t_bit / len(frames) * 1e6:6.2f} µs/frame)")
+    print(f"  tabela    : {t_tab * 1e3:8.2f} ms  ({t_tab / len(frames) * 1e6:6.2f} µs/frame)  -> {t_bit / t_tab:.1f}x")
+    print(f"📊 montar_comando em {len(comandos)} chamadas")
+    print(f"  recriando : {t_cmd_antigo * 1e3:8.2f} ms")
+    print(f"  em cache  : {t_cmd_cache * 1e3:8.2f} ms  -> {t_cmd_antigo / t_cmd_cache:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import gzip
+import json
+import random
+import time
+
+import formato_binario
+from envio_api import CAMPOS_TEXTO, FORMATO_BINARIO, FORMATO_TEXTO, nova_leitura, serializar
+
+REPETICOES = 5
+
+# Abreviação do texto "T:..|H:.." → campo
+CAMPO_DA_ABREVIACAO = {abrev: campo for abrev, campo, _ in CAMPOS_TEXTO}
+
+
+def leituras_exemplo(n_estacoes, ciclos, rnd):
+    """Leituras parecidas com as reais: ciclos de 60 s de n estações"""
+    leituras = []
+    inicio = time.time()
+    for ciclo in range(ciclos):
+        for estacao in range(1, n_estacoes + 1):
+            dados = {
+                "temperatura": round(rnd.uniform(-5, 40), 1),
+                "umidade": round(rnd.uniform(20, 100), 1),
+                "pressao": float(rnd.randint(900, 1030)),
+                "ruido": round(rnd.uniform(30, 90), 1),
+                "iluminancia": rnd.randint(0, 200000),
+                "chuva": round(rnd.uniform(0, 50), 1),
+                "vento_velocidade": rnd.randint(0, 3000) * 0.036,
+                "vento_direcao": rnd.randint(0, 359),
+                "pm25": rnd.randint(0, 200),
+                "pm10": rnd.randint(0, 300),
+            }
+            leitura = nova_leitura(estacao, dados)
+            leitura["momento"] = inicio + 60 * ciclo
+            leituras.append(leitura)
+    return leituras
+
+
+def decodificar_texto(corpo):
+    """O que o servidor faz hoje: JSON + parse de "T:..|H:.." de cada leitura"""
+    leituras = []
+    for payload in json.loads(corpo):
+        dados = {}
+        for parte in payload["sensores"].split("|"):
+            chave, valor = parte.split(":")
+            dados[CAMPO_DA_ABREVIACAO[chave]] = float(valor)
+        leituras.append({"nome": payload["nome"], "data": payload["data_leitura"], "dados": dados})
+    return leituras
+
+
+def cronometrar(funcao, *args):
+    """Melhor tempo (s) entre REPETICOES chamadas"""
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamanho e CPU do corpo do storeOrUpdate: texto x binário")
+    parser.add_argument("--estacoes", type=int, default=100)
+    parser.add_argument("--ciclos", type=int, default=1, help="ciclos no mesmo lote (>1 = reenvio de acumulado)")
+    args = parser.parse_args()
+
+    leituras = leituras_exemplo(args.estacoes, args.ciclos, random.Random(0))
+
+    # Confere o caminho de volta antes de medir
+    corpo_binario, _ = serializar(leituras, FORMATO_BINARIO)
+    for original, decodificada in zip(leituras, formato_binario.decodificar(corpo_binario)):
+        assert decodificada["estacao"] == original["estacao"]
+        for campo, valor in original["dados"].items():
+            assert abs(decodificada["dados"][campo] - valor) < 1e-6, campo
+
+    def texto_gzip(lote):
+        return gzip.compress(serializar(lote, FORMATO_TEXTO, em_lote=True)[0], compresslevel=6)
+
+    variantes = [
+        ("texto (JSON)", lambda: serializar(leituras, FORMATO_TEXTO, em_lote=True)[0], decodificar_texto),
+        ("texto + gzip", lambda: texto_gzip(leituras), lambda c: decodificar_texto(gzip.decompress(c))),
+        ("binário", lambda: serializar(leituras, FORMATO_BINARIO)[0], formato_binario.decodificar),
+        ("binário + gzip", lambda: serializar(leituras, FORMATO_BINARIO, comprimir=True)[0],
+         formato_binario.decodificar),
+    ]
+
+    print(f"📊 Lote de {len(leituras)} leitura(s) ({args.estacoes} estações x {args.ciclos} ciclo(s))")
+    print(f"  {'formato':<16}{'bytes':>10}{'B/leitura':>11}{'codificar':>13}{'decodificar':>14}")
+    referencia = None
+    for nome, codificar, decodificar in variantes:
+        corpo = codificar()
+        t_cod = cronometrar(codificar)
+        t_dec = cronometrar(decodificar, corpo)
+        referencia = referencia or len(corpo)
+        print(f"  {nome:<16}{len(corpo):>10}{len(corpo) / len(leituras):>11.1f}"
+              f"{t_cod * 1e3:>10.2f} ms{t_dec * 1e3:>11.2f} ms   ({referencia / len(corpo):.1f}x menor)")
+
+
+if __name__ == "__main__":
+    main()
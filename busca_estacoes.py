@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from envio_api import criar_sessao
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = 5         # segundos por estação
+PRAZO_TOTAL = 8     # segundos para a busca inteira: o que não chegou sai como desatualizado
+MAX_PARALELAS = 16
+
+# Coluna extra com a situação de cada linha
+SITUACAO = "Situação"
+OK = "✅ atual"
+
+
+class BuscadorEstacoes:
+    """
+    Busca estacoes_mets/{id} de todas as estações ao mesmo tempo (pool de
+    threads sobre uma sessão keep-alive) e devolve o que chegou até o prazo.
+
+    Estação que falhou ou não respondeu a tempo não some da tabela: volta a
+    última leitura boa dela, marcada como desatualizada (ou só o nome, se
+    nunca respondeu).
+    """
+
+    def __init__(self, urls: List[str], timeout: float = TIMEOUT, prazo: float = PRAZO_TOTAL,
+                 max_paralelas: int = MAX_PARALELAS):
+        self.urls = list(urls)
+        self.timeout = timeout
+        self.prazo = prazo
+        paralelas = max(1, min(max_paralelas, len(self.urls)))
+        # Sem novas tentativas automáticas: o prazo total manda
+        self.sessao = criar_sessao(paralelas, tentativas=0)
+        self.executor = ThreadPoolExecutor(max_workers=paralelas, thread_name_prefix="busca-estacao")
+        self._ultimas: Dict[str, Tuple[dict, float]] = {}   # url → (arrResponse, instante)
+        self._trava = threading.Lock()
+
+    def _buscar(self, url: str) -> dict:
+        response = self.sessao.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        linha = response.json().get("arrResponse", {})
+        with self._trava:
+            self._ultimas[url] = (linha, time.time())
+        return linha
+
+    def _desatualizada(self, url: str, motivo: str) -> dict:
+        with self._trava:
+            anterior = self._ultimas.get(url)
+        if anterior is None:
+            return {"nome": f"Estação {url.rstrip('/').rsplit('/', 1)[-1]}", SITUACAO: f"⚠️ sem dados ({motivo})"}
+        linha, instante = anterior
+        return {**linha, SITUACAO: f"⚠️ desatualizada há {time.time() - instante:.0f} s ({motivo})"}
+
+    def buscar(self) -> Tuple[List[dict], int]:
+        """Linhas de todas as estações (na ordem de `urls`) e quantas estão desatualizadas"""
+        futuros = {url: self.executor.submit(self._buscar, url) for url in self.urls}
+        wait(futuros.values(), timeout=self.prazo)
+        linhas = []
+        desatualizadas = 0
+        for url, futuro in futuros.items():
+            if not futuro.done():
+                futuro.cancel()  # se ainda nem começou, não ocupa o pool
+                linhas.append(self._desatualizada(url, "sem resposta no prazo"))
+            elif futuro.exception() is not None:
+                linhas.append(self._desatualizada(url, type(futuro.exception()).__name__))
+            else:
+                linhas.append({**futuro.result(), SITUACAO: OK})
+                continue
+            desatualizadas += 1
+        return linhas, desatualizadas
+
+
+class CacheRevalidavel:
+    """
+    Stale-while-revalidate: `obter` devolve na hora o último valor carregado
+    e, se ele passou de `ttl`, dispara `carregar` numa thread para a próxima
+    vez. Só a primeira chamada do processo espera (não há o que mostrar).
+
+    Se `carregar` falhar, o valor anterior continua valendo e a nova
+    tentativa só sai depois de outro `ttl`.
+    """
+
+    def __init__(self, carregar: Callable[[], Any], ttl: float, relogio=time.monotonic):
+        self.carregar = carregar
+        self.ttl = ttl
+        self.relogio = relogio
+        self._valor = None
+        self._carregado_em: Optional[float] = None
+        self._tentativa_em: Optional[float] = None
+        self._erro: Optional[BaseException] = None
+        self._atualizando = False
+        self._primeira_carga = threading.Event()
+        self._trava = threading.Lock()
+
+    def _atualizar(self):
+        try:
+            valor = self.carregar()
+        except Exception as e:
+            logger.warning("Falha ao atualizar o cache (mantendo o valor anterior): %s", e)
+            with self._trava:
+                self._erro = e
+        else:
+            with self._trava:
+                self._valor = valor
+                self._carregado_em = self.relogio()
+                self._erro = None
+        finally:
+            with self._trava:
+                self._atualizando = False
+            self._primeira_carga.set()
+
+    def revalidar(self) -> bool:
+        """Dispara uma atualização em segundo plano (False se já há uma em curso)"""
+        with self._trava:
+            if self._atualizando:
+                return False
+            self._atualizando = True
+            self._tentativa_em = self.relogio()
+        threading.Thread(target=self._atualizar, name="revalidar-cache", daemon=True).start()
+        return True
+
+    def obter(self) -> Tuple[Any, Optional[float]]:
+        """(valor, idade em s) sem esperar a API; None/None se nunca carregou"""
+        with self._trava:
+            vencido = self._tentativa_em is None or self.relogio() - self._tentativa_em >= self.ttl
+        if vencido:
+            self.revalidar()
+        return self._instantaneo()
+
+    def _instantaneo(self) -> Tuple[Any, Optional[float]]:
+        if self._carregado_em is None:
+            self._primeira_carga.wait()
+        with self._trava:
+            if self._carregado_em is None:
+                return None, None
+            return self._valor, self.relogio() - self._carregado_em
+
+    @property
+    def atualizando(self) -> bool:
+        return self._atualizando
+
+    @property
+    def erro(self) -> Optional[BaseException]:
+        return self._erro
+
+
+class AtualizadorPeriodico(CacheRevalidavel):
+    """
+    Um só laço por processo chama `carregar` a cada `intervalo` e guarda o
+    resultado; `obter` só lê esse instantâneo. As chamadas à API ficam
+    constantes, não importa quantas sessões leem.
+    """
+
+    def __init__(self, carregar: Callable[[], Any], intervalo: float, relogio=time.monotonic):
+        super().__init__(carregar, ttl=intervalo, relogio=relogio)
+        self.cargas = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._laco, name="atualizador-periodico", daemon=True)
+        self._thread.start()
+
+    def _laco(self):
+        while not self._parar.is_set():
+            inicio = self.relogio()
+            with self._trava:
+                self._atualizando = True
+                self._tentativa_em = inicio
+                self.cargas += 1
+            self._atualizar()
+            # Cadência fixa: desconta o tempo que a carga levou
+            self._parar.wait(max(0.0, self.ttl - (self.relogio() - inicio)))
+
+    def obter(self) -> Tuple[Any, Optional[float]]:
+        """(valor, idade em s) do último ciclo; só espera antes da primeira carga"""
+        return self._instantaneo()
+
+    def parar(self, timeout: Optional[float] = None):
+        self._parar.set()
+        self._thread.join(timeout)
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Banco local com as leituras ainda não confirmadas pela API
+ARQUIVO_CAIXA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "caixa_saida.db")
+
+# Limite de leituras guardadas (≈ 1 semana de 100 estações a cada 60 s)
+MAX_LEITURAS = 1_000_000
+
+
+class CaixaSaida:
+    """
+    Caixa de saída em SQLite (modo WAL) para o envio store-and-forward.
+
+    Toda leitura é gravada aqui antes de ir para a API e só é apagada depois
+    que a API confirmou o lote (entrega pelo menos uma vez: se o programa
+    cair entre o POST e a confirmação, o lote é reenviado). Pode ser usada
+    por várias threads.
+    """
+
+    def __init__(self, caminho: str = ARQUIVO_CAIXA, max_leituras: int = MAX_LEITURAS):
+        self.caminho = caminho
+        self.max_leituras = max_leituras
+        self.descartadas = 0
+        self._trava = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        # Com WAL, NORMAL só perde transações se o sistema (não o programa) cair
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS leituras ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " criado_em REAL NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+
+    def guardar(self, leituras: List[Dict]) -> List[Dict]:
+        """Grava várias leituras numa única transação; devolve as que saíram por falta de espaço"""
+        agora = time.time()
+        linhas = [(agora, json.dumps(p, ensure_ascii=False)) for p in leituras]
+        descartadas = []
+        with self._trava:
+            with self._conexao:
+                self._conexao.execute("BEGIN")
+                self._conexao.executemany("INSERT INTO leituras (criado_em, payload) VALUES (?, ?)", linhas)
+                excesso = self._contar() - self.max_leituras
+                if excesso > 0:
+                    # Caixa cheia: as leituras mais antigas saem primeiro
+                    antigas = self._conexao.execute(
+                        "SELECT id, payload FROM leituras ORDER BY id LIMIT ?", (excesso,)).fetchall()
+                    self._conexao.execute("DELETE FROM leituras WHERE id <= ?", (antigas[-1][0],))
+                    descartadas = [json.loads(payload) for _, payload in antigas]
+                    self.descartadas += excesso
+        if descartadas:
+            logger.warning("Caixa de saída cheia: %d leitura(s) antiga(s) descartada(s)", excesso)
+        return descartadas
+
+    def proximas(self, quantidade: int) -> Tuple[int, List[Dict]]:
+        """As `quantidade` leituras mais antigas: (id da última, leituras)"""
+        with self._trava:
+            linhas = self._conexao.execute(
+                "SELECT id, payload FROM leituras ORDER BY id LIMIT ?", (quantidade,)).fetchall()
+        if not linhas:
+            return 0, []
+        return linhas[-1][0], [json.loads(payload) for _, payload in linhas]
+
+    def confirmar(self, ate_id: int):
+        """Apaga as leituras já aceitas pela API (ids até `ate_id`)"""
+        with self._trava:
+            self._conexao.execute("DELETE FROM leituras WHERE id <= ?", (ate_id,))
+
+    def _contar(self) -> int:
+        # Só se apaga do início (ids em ordem), então os ids restantes são
+        # contíguos e MIN/MAX pelo índice evitam o COUNT(*) da tabela toda
+        menor, maior = self._conexao.execute("SELECT MIN(id), MAX(id) FROM leituras").fetchone()
+        return maior - menor + 1 if menor is not None else 0
+
+    def pendentes(self) -> int:
+        with self._trava:
+            return self._contar()
+
+    def mais_antiga(self) -> float:
+        """Idade em segundos da leitura mais antiga não enviada (0 se vazia)"""
+        with self._trava:
+            criado_em = self._conexao.execute("SELECT MIN(criado_em) FROM leituras").fetchone()[0]
+        return time.time() - criado_em if criado_em is not None else 0.0
+
+    def fechar(self):
+        with self._trava:
+            self._conexao.close()
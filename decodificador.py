@@ -0,0 +1,111 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+from modbus_rtu import FC_LER_REGISTROS, RespostaInvalida, conferir_resposta, crc_valido, montar_comando
+from plano_leitura import Bloco
+
+# Valores de 32 bits divididos em dois registradores: nome → (parte alta, parte baixa)
+COMBINADOS = {
+    "Illuminance (lux)": ("Illuminance High", "Illuminance Low"),
+}
+
+
+class DecodificadorBloco:
+    """
+    Leitura e decodificação vetorizada de um bloco FC03 para várias estações.
+
+    Cada resposta é copiada para uma linha de um buffer pré-alocado
+    (uma linha por estação). O buffer é visto como uma matriz big-endian
+    uint16/int16 sem cópia; a escala é aplicada com uma única multiplicação
+    por um vetor pré-calculado e os valores de 32 bits são remontados no
+    mesmo passo, para todas as estações de uma vez. Nenhum array é alocado
+    por leitura: `saida` é sobrescrita na próxima decodificação.
+
+    Só respostas com CRC válido chegam ao buffer. `validas[linha]` diz se a
+    última leitura da linha deu certo; linhas que falharam (ou nunca foram
+    lidas) saem como NaN em `saida`.
+    """
+
+    def __init__(self, bloco: Bloco, n_estacoes: int = 1, combinados: Dict[str, Tuple[str, str]] = COMBINADOS):
+        self.bloco = bloco
+        q = bloco.quantidade
+        offsets = {c.nome: c.offset for c in bloco.campos}
+        combinados = {nome: partes for nome, partes in combinados.items() if all(p in offsets for p in partes)}
+        self.nomes = [c.nome for c in bloco.campos] + list(combinados)
+
+        self.tamanho_frame = 5 + 2 * q
+        self.buffer = bytearray(n_estacoes * self.tamanho_frame)
+        # Vistas (estação x registrador) sobre o payload de cada linha, sem cópia
+        forma, passos = (n_estacoes, q), (self.tamanho_frame, 2)
+        self._sem_sinal = np.ndarray(forma, dtype=">u2", buffer=self.buffer, offset=3, strides=passos)
+        self._com_sinal = np.ndarray(forma, dtype=">i2", buffer=self.buffer, offset=3, strides=passos)
+        self._linhas = memoryview(self.buffer)
+        # Resposta é montada e conferida aqui antes de ir para a linha da estação
+        self._rascunho = bytearray(self.tamanho_frame)
+        self.validas = np.zeros(n_estacoes, dtype=bool)
+        self._invalidas = np.empty(n_estacoes, dtype=bool)
+
+        self._sinal = np.zeros(q, dtype=bool)
+        self._escalas = np.ones(q)
+        for campo in bloco.campos:
+            self._sinal[campo.offset] = campo.signed
+            self._escalas[campo.offset] = campo.escala
+        self._indices = np.array([c.offset for c in bloco.campos], dtype=np.intp)
+        self._altos = np.array([offsets[a] for a, _ in combinados.values()], dtype=np.intp)
+        self._baixos = np.array([offsets[b] for _, b in combinados.values()], dtype=np.intp)
+
+        self._brutos = np.empty(forma)
+        self._escalados = np.empty(forma)
+        self._tmp_baixos = np.empty((n_estacoes, len(combinados)))
+        self.saida = np.empty((n_estacoes, len(self.nomes)))
+        self._n_campos = len(bloco.campos)
+        self._requisicoes = {}
+
+    def decodificar(self) -> np.ndarray:
+        """Decodifica todas as linhas do buffer; `saida[linha]` segue a ordem de `nomes`"""
+        np.copyto(self._brutos, self._sem_sinal, casting="unsafe")
+        np.copyto(self._brutos, self._com_sinal, casting="unsafe", where=self._sinal)
+        np.multiply(self._brutos, self._escalas, out=self._escalados)
+        np.take(self._escalados, self._indices, axis=1, out=self.saida[:, :self._n_campos])
+        if len(self._altos):
+            combinados = self.saida[:, self._n_campos:]
+            np.take(self._brutos, self._altos, axis=1, out=combinados)
+            np.take(self._brutos, self._baixos, axis=1, out=self._tmp_baixos)
+            np.multiply(combinados, 65536, out=combinados)
+            np.add(combinados, self._tmp_baixos, out=combinados)
+        np.logical_not(self.validas, out=self._invalidas)
+        np.copyto(self.saida, np.nan, where=self._invalidas[:, None])
+        return self.saida
+
+    def ler(self, ser, slave_id: int, linha: int = 0):
+        """Lê o bloco do escravo para a linha do buffer (levanta ErroModbus e invalida a linha se falhar)"""
+        self.validas[linha] = False
+        if slave_id not in self._requisicoes:
+            self._requisicoes[slave_id] = montar_comando(slave_id, self.bloco.inicio, self.bloco.quantidade)
+        ser.reset_input_buffer()
+        ser.write(self._requisicoes[slave_id])
+
+        cabecalho = ser.read(3)
+        if (len(cabecalho) < 3 or cabecalho[0] != slave_id or cabecalho[1] != FC_LER_REGISTROS
+                or cabecalho[2] != 2 * self.bloco.quantidade):
+            # Exceção, lixo ou timeout: o caminho lento monta o erro tipado
+            if len(cabecalho) == 3 and cabecalho[0] == slave_id and cabecalho[1] == FC_LER_REGISTROS | 0x80:
+                cabecalho += ser.read(2)
+            conferir_resposta(cabecalho, slave_id, FC_LER_REGISTROS)
+            raise RespostaInvalida(f"Byte count {cabecalho[2]} inesperado do escravo {slave_id}")
+        resto = ser.read(self.tamanho_frame - 3)
+        if len(resto) != self.tamanho_frame - 3:
+            raise RespostaInvalida(f"Frame truncado do escravo {slave_id}")
+        rascunho = self._rascunho
+        rascunho[:3] = cabecalho
+        rascunho[3:] = resto
+        if not crc_valido(rascunho):
+            raise RespostaInvalida(f"CRC inválido do escravo {slave_id}")
+        inicio = linha * self.tamanho_frame
+        self._linhas[inicio:inicio + self.tamanho_frame] = rascunho
+        self.validas[linha] = True
+
+    def como_dict(self, linha: int = 0) -> Dict[str, float]:
+        """Última decodificação de uma linha como dicionário (NaN se a leitura falhou; aloca)"""
+        return dict(zip(self.nomes, self.saida[linha].tolist()))
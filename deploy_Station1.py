@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
-import requests
 import time
+import os
+
+from busca_estacoes import SITUACAO, BuscadorEstacoes, CacheRevalidavel
 
 # ===========================================
 # CONFIGURAÇÕES INICIAIS
@@ -12,23 +14,11 @@ st.set_page_config(
     layout="wide"
 )
 
-urls = [
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/1",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/2",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/3",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/4",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/5",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/6",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/7",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/8",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/9",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/10",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/11",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/12"
-
+# URL base da API: IOTHUB_URL=http://127.0.0.1:8080/api/v1 usa o simulador_iothub.py
+API_BASE = os.environ.get("IOTHUB_URL", "https://iothub.eletromidia.com.br/api/v1").rstrip("/")
+N_ESTACOES = int(os.environ.get("IOTHUB_ESTACOES", 12))
 
-
-]
+urls = [f"{API_BASE}/estacoes_mets/{i}" for i in range(1, N_ESTACOES + 1)]
 
 REFRESH_INTERVAL = 60  # segundos
 
@@ -36,18 +26,18 @@ REFRESH_INTERVAL = 60  # segundos
 # ===========================================
 # FUNÇÃO PARA BUSCAR OS DADOS
 # ===========================================
-@st.cache_data(ttl=REFRESH_INTERVAL)
-def get_estacoes_data():
-    data = []
-    for url in urls:
-        try:
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                json_data = response.json().get("arrResponse", {})
-                data.append(json_data)
-        except Exception as e:
-            st.warning(f"Erro ao acessar {url}: {e}")
-    return pd.DataFrame(data)
+# Buscador e cache: um só por processo, compartilhado pelas sessões
+@st.cache_resource
+def get_cache():
+    buscador = BuscadorEstacoes(urls)
+
+    def carregar():
+        # Todas as estações ao mesmo tempo; o que não chegar no prazo vem desatualizado
+        linhas, desatualizadas = buscador.buscar()
+        return pd.DataFrame(linhas), desatualizadas
+
+    # Serve a última tabela na hora e atualiza em segundo plano depois do TTL
+    return CacheRevalidavel(carregar, ttl=REFRESH_INTERVAL)
 
 
 # ===========================================
@@ -56,11 +46,21 @@ def get_estacoes_data():
 st.title("🌦️ Estações Meteorológicas - Eletromidia")
 st.markdown("Dados obtidos automaticamente via API IOT Hub")
 
-# Atualização automática
-with st.spinner("Atualizando dados..."):
-    df = get_estacoes_data()
+# Atualização automática (sem bloquear a página: a busca roda em segundo plano)
+cache = get_cache()
+dados, idade = cache.obter()
+df, desatualizadas = dados if dados is not None else (pd.DataFrame(), 0)
+df = df.copy()  # o DataFrame do cache é de todas as sessões; abaixo ganha colunas
+
+if idade is not None:
+    st.caption(f"🕒 Dados de {idade:.0f} s atrás" + (" · atualizando..." if cache.atualizando else ""))
+if cache.erro is not None:
+    st.warning(f"Última atualização falhou: {cache.erro}")
+if desatualizadas:
+    st.warning(f"{desatualizadas} de {len(urls)} estação(ões) sem resposta: mostrando a última leitura conhecida.")
 
-if not df.empty:
+# Sem nenhuma leitura (nem antiga) não há colunas de medição
+if "Temperatura" in df:
     # Converter colunas numéricas
     def to_float(s):
         if isinstance(s, str):
@@ -96,6 +96,7 @@ if not df.empty:
         df[
             [
                 "nome",
+                SITUACAO,
                 "Última Leitura",
                 "Temperatura",
                 "Umidade",
@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
-import requests
 import time
+import os
+
+from busca_estacoes import SITUACAO, AtualizadorPeriodico, BuscadorEstacoes
 
 # ===========================================
 # CONFIGURAÇÕES INICIAIS
@@ -12,13 +14,11 @@ st.set_page_config(
     layout="wide"
 )
 
-urls = [
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/1",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/2",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/3",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/4",
-    "https://iothub.eletromidia.com.br/api/v1/estacoes_mets/5"
-]
+# URL base da API: IOTHUB_URL=http://127.0.0.1:8080/api/v1 usa o simulador_iothub.py
+API_BASE = os.environ.get("IOTHUB_URL", "https://iothub.eletromidia.com.br/api/v1").rstrip("/")
+N_ESTACOES = int(os.environ.get("IOTHUB_ESTACOES", 5))
+
+urls = [f"{API_BASE}/estacoes_mets/{i}" for i in range(1, N_ESTACOES + 1)]
 
 REFRESH_INTERVAL = 60  # segundos
 
@@ -26,18 +26,17 @@ REFRESH_INTERVAL = 60  # segundos
 # ===========================================
 # FUNÇÃO PARA BUSCAR OS DADOS
 # ===========================================
-@st.cache_data(ttl=REFRESH_INTERVAL)
-def get_estacoes_data():
-    data = []
-    for url in urls:
-        try:
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                json_data = response.json().get("arrResponse", {})
-                data.append(json_data)
-        except Exception as e:
-            st.warning(f"Erro ao acessar {url}: {e}")
-    return pd.DataFrame(data)
+# Um só atualizador por processo: busca a cada REFRESH_INTERVAL, em segundo
+# plano, e todas as sessões leem o mesmo instantâneo
+@st.cache_resource
+def get_atualizador():
+    buscador = BuscadorEstacoes(urls)
+
+    def carregar():
+        linhas, desatualizadas = buscador.buscar()
+        return pd.DataFrame(linhas), desatualizadas
+
+    return AtualizadorPeriodico(carregar, intervalo=REFRESH_INTERVAL)
 
 
 # ===========================================
@@ -46,11 +45,21 @@ def get_estacoes_data():
 st.title("🌦️ Estações Meteorológicas - Eletromidia")
 st.markdown("Dados obtidos automaticamente via API IOT Hub")
 
-# Atualização automática
-with st.spinner("Atualizando dados..."):
-    df = get_estacoes_data()
-
-if not df.empty:
+# Atualização automática (a página só lê o instantâneo, não chama a API)
+atualizador = get_atualizador()
+dados, idade = atualizador.obter()
+df, desatualizadas = dados if dados is not None else (pd.DataFrame(), 0)
+df = df.copy()  # o DataFrame do cache é de todas as sessões; abaixo ganha colunas
+
+if idade is not None:
+    st.caption(f"🕒 Dados de {idade:.0f} s atrás")
+if atualizador.erro is not None:
+    st.warning(f"Última atualização falhou: {atualizador.erro}")
+if desatualizadas:
+    st.warning(f"{desatualizadas} de {len(urls)} estação(ões) sem resposta: mostrando a última leitura conhecida.")
+
+# Sem nenhuma leitura (nem antiga) não há colunas de medição
+if "Temperatura" in df:
     # Converter colunas numéricas
     def to_float(s):
         if isinstance(s, str):
@@ -86,6 +95,7 @@ if not df.empty:
         df[
             [
                 "nome",
+                SITUACAO,
                 "Última Leitura",
                 "Temperatura",
                 "Umidade",
@@ -0,0 +1,100 @@
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Estados do disjuntor
+FECHADO = "fechado"          # estação saudável: leitura completa a cada ciclo
+ABERTO = "aberto"            # estação falhando: não é lida até a próxima sonda
+MEIO_ABERTO = "meio-aberto"  # hora da sonda: uma leitura barata decide se volta
+
+# Ações devolvidas por Disjuntor.acao()
+LEITURA_COMPLETA = "completa"
+SONDA = "sonda"
+
+
+class Disjuntor:
+    """
+    Saúde de uma estação com backoff exponencial.
+
+    Depois de `limite_falhas` falhas seguidas o disjuntor abre e a estação só
+    é sondada (uma leitura de um registrador) após `espera_inicial` segundos;
+    cada sonda que falha dobra a espera até `espera_maxima`.
+    """
+
+    def __init__(self, nome: str, limite_falhas: int = 3, espera_inicial: float = 60,
+                 espera_maxima: float = 3600, relogio=time.monotonic):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.relogio = relogio
+
+        self.estado = FECHADO
+        self.falhas_seguidas = 0
+        self.espera = espera_inicial
+        self.proxima_sonda: Optional[float] = None
+        self.aberto_desde: Optional[float] = None
+        self.total_sucessos = 0
+        self.total_falhas = 0
+        self.total_sondas = 0
+        self.ultima_latencia: Optional[float] = None
+
+    def acao(self) -> Optional[str]:
+        """O que fazer com a estação neste ciclo: LEITURA_COMPLETA, SONDA ou None (pular)"""
+        if self.estado == FECHADO:
+            return LEITURA_COMPLETA
+        if self.relogio() >= self.proxima_sonda:
+            self._mudar_estado(MEIO_ABERTO)
+            self.total_sondas += 1
+            return SONDA
+        return None
+
+    def registrar_sucesso(self, latencia: Optional[float] = None):
+        self.total_sucessos += 1
+        self.ultima_latencia = latencia
+        self.falhas_seguidas = 0
+        if self.estado != FECHADO:
+            fora = self.relogio() - self.aberto_desde
+            logger.info("Estação %s respondeu novamente após %.0f s fora; voltando à leitura completa", self.nome, fora)
+            self.espera = self.espera_inicial
+            self.proxima_sonda = None
+            self.aberto_desde = None
+            self._mudar_estado(FECHADO)
+
+    def registrar_falha(self):
+        self.total_falhas += 1
+        self.falhas_seguidas += 1
+        agora = self.relogio()
+        if self.estado == MEIO_ABERTO:
+            # Sonda falhou: dobra a espera
+            self.espera = min(self.espera * 2, self.espera_maxima)
+        elif self.estado == FECHADO and self.falhas_seguidas < self.limite_falhas:
+            return
+        elif self.estado == FECHADO:
+            self.aberto_desde = agora
+        self.proxima_sonda = agora + self.espera
+        self._mudar_estado(ABERTO)
+        logger.warning("Estação %s com %d falhas seguidas; próxima sonda em %.0f s",
+                       self.nome, self.falhas_seguidas, self.espera)
+
+    def _mudar_estado(self, novo: str):
+        if novo != self.estado:
+            logger.info("Disjuntor da estação %s: %s -> %s", self.nome, self.estado, novo)
+            self.estado = novo
+
+    def metricas(self) -> dict:
+        """Estado e contadores para log/monitoramento"""
+        agora = self.relogio()
+        return {
+            "estado": self.estado,
+            "falhas_seguidas": self.falhas_seguidas,
+            "total_sucessos": self.total_sucessos,
+            "total_falhas": self.total_falhas,
+            "total_sondas": self.total_sondas,
+            "espera_s": self.espera if self.estado != FECHADO else 0,
+            "proxima_sonda_em_s": max(0.0, self.proxima_sonda - agora) if self.proxima_sonda else None,
+            "fora_ha_s": agora - self.aberto_desde if self.aberto_desde else None,
+            "ultima_latencia_s": self.ultima_latencia,
+        }
@@ -0,0 +1,451 @@
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+import formato_binario
+from caixa_saida import CaixaSaida
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# URL base da API (IOTHUB_URL aponta para o simulador_iothub.py em testes locais)
+API_BASE = os.environ.get("IOTHUB_URL", "https://iothub.eletromidia.com.br/api/v1").rstrip("/")
+ENDPOINT = f"{API_BASE}/estacoes_mets/storeOrUpdate"
+TIMEOUT = 10  # segundos
+
+# Lote: quantas leituras vão num único POST e de quanto em quanto tempo enviar
+TAMANHO_LOTE = 100
+INTERVALO_ENVIO = 0     # segundos; 0 = envia ao fim de todo ciclo
+MAX_PENDENTES = 10000   # leituras guardadas enquanto a API não responde
+NOME_ESTACAO = "Estação {}"
+
+# Formato do corpo do POST (Content-Type):
+#   texto   → application/json, um {"nome", "sensores": "T:..|H:..", "data_leitura"}
+#             por POST (com em_lote=True, uma lista deles num POST só)
+#   binario → formato_binario.TIPO_CONTEUDO, registradores brutos em colunas
+#             (com comprimir=True vai com Content-Encoding: gzip)
+FORMATO_TEXTO = "texto"
+FORMATO_BINARIO = "binario"
+# Resposta da API a uma lista JSON que ela não aceita: volta a um objeto por POST
+STATUS_LOTE_RECUSADO = (400, 415)
+# Leitura que não dá para serializar (estação/instante fora do formato, valor não numérico)
+ERROS_CODIFICACAO = (struct.error, ValueError, TypeError, OverflowError)
+
+# Fila entre leitura e envio: tamanho e o que fazer quando enche
+TAMANHO_FILA = 1000
+DESCARTAR_ANTIGA = "descartar_antiga"   # tira a leitura mais antiga da fila
+DESCARTAR_NOVA = "descartar_nova"       # recusa a leitura que chegou
+BLOQUEAR = "bloquear"                   # a leitura espera (até espera_bloqueio) por espaço
+ESPERA_REENVIO = 30     # segundos entre novas tentativas com a API fora
+
+# Reenvio do acumulado na caixa de saída (depois de uma queda da API)
+TAMANHO_LOTE_REENVIO = 1000
+VAZAO_MAXIMA = 2000     # leituras/s enviadas no máximo, para não derrubar a API
+
+# Sessão HTTP: conexões mantidas abertas (keep-alive) e novas tentativas
+TENTATIVAS = 3
+FATOR_ESPERA = 0.5      # espera entre tentativas: 0.5 s, 1 s, 2 s...
+STATUS_REPETIR = (429, 502, 503, 504)
+
+
+def criar_sessao(tamanho_pool: int = 10, tentativas: int = TENTATIVAS) -> requests.Session:
+    """
+    Sessão com pool de conexões persistentes e novas tentativas automáticas.
+
+    O POST também é repetido: o storeOrUpdate grava a última leitura da
+    estação, então reenviar a mesma leitura não causa duplicidade.
+    """
+    retry = Retry(total=tentativas, backoff_factor=FATOR_ESPERA, status_forcelist=STATUS_REPETIR,
+                  allowed_methods=frozenset({"GET", "POST"}), raise_on_status=False)
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, tamanho_pool), max_retries=retry)
+    sessao = requests.Session()
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+def estatisticas_conexoes(sessao: requests.Session) -> Dict[str, float]:
+    """Conexões TCP/TLS abertas x requisições feitas pela sessão (reuso do keep-alive)"""
+    conexoes = requisicoes = 0
+    adaptadores = {id(a): a for a in sessao.adapters.values()}.values()
+    for adaptador in adaptadores:
+        pools = adaptador.poolmanager.pools
+        for chave in pools.keys():
+            pool = pools[chave]
+            conexoes += pool.num_connections
+            requisicoes += pool.num_requests
+    return {
+        "conexoes_abertas": conexoes,
+        "requisicoes": requisicoes,
+        "reuso": 1 - conexoes / requisicoes if requisicoes else 0.0,
+    }
+
+
+def nova_leitura(estacao: int, dados: Dict[str, float]) -> Dict:
+    """Leitura como é guardada até o envio (o formato do corpo é escolhido só no POST)"""
+    return {"estacao": estacao, "momento": time.time(), "dados": dados}
+
+
+# Campos do texto "sensores": (abreviação, campo, formato)
+CAMPOS_TEXTO = (
+    ("T",    "temperatura",      ".1f"),
+    ("H",    "umidade",          ".1f"),
+    ("P",    "pressao",          ".1f"),
+    ("R",    "ruido",            ".1f"),
+    ("L",    "iluminancia",      ".1f"),
+    ("CH",   "chuva",            ".1f"),
+    ("VV",   "vento_velocidade", ".1f"),
+    ("DV",   "vento_direcao",    ".1f"),
+    ("PM25", "pm25",             ".0f"),
+    ("PM10", "pm10",             ".0f"),
+)
+
+
+def montar_payload(nome: str, dados: Dict[str, float]) -> Dict[str, str]:
+    """
+    Payload do storeOrUpdate para uma estação ("T:..|H:..|...").
+    Só os campos presentes em `dados` entram (envio por exceção).
+    """
+    return {
+        "nome": nome,
+        "sensores": "|".join(f"{abrev}:{dados[campo]:{formato}}"
+                             for abrev, campo, formato in CAMPOS_TEXTO if campo in dados),
+    }
+
+
+def payload_texto(leitura: Dict) -> Dict[str, str]:
+    """Payload JSON de uma leitura, com a hora em que foi feita"""
+    payload = montar_payload(NOME_ESTACAO.format(leitura["estacao"]), leitura["dados"])
+    # A leitura pode ser enviada bem depois (caixa de saída): vai com a hora da coleta
+    payload["data_leitura"] = datetime.fromtimestamp(leitura["momento"]).isoformat(timespec="seconds")
+    return payload
+
+
+def serializar(lote: List[Dict], formato: str = FORMATO_TEXTO, comprimir: bool = False,
+               em_lote: bool = False) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Corpo e cabeçalhos do POST de um lote de leituras.
+
+    No formato texto vai um objeto JSON (lote de uma leitura), como o
+    storeOrUpdate sempre recebeu; com `em_lote=True`, uma lista JSON.
+    """
+    if formato == FORMATO_BINARIO:
+        cabecalhos = {"Content-Type": formato_binario.TIPO_CONTEUDO}
+        if comprimir:
+            cabecalhos["Content-Encoding"] = "gzip"
+        return formato_binario.codificar(lote, comprimir), cabecalhos
+    if em_lote:
+        payload = [payload_texto(l) for l in lote]
+    elif len(lote) == 1:
+        payload = payload_texto(lote[0])
+    else:
+        raise ValueError(f"Formato texto sem em_lote envia uma leitura por POST, não {len(lote)}")
+    corpo = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return corpo, {"Content-Type": "application/json"}
+
+
+class EnviadorLotes:
+    """
+    Junta as leituras das estações e envia em lotes pela mesma sessão.
+
+    O corpo do POST depende de `formato` (ver FORMATO_TEXTO/FORMATO_BINARIO).
+    No formato texto cada leitura vai num POST (conexão keep-alive); com
+    `em_lote=True` o lote inteiro vai numa lista JSON, e se a API recusar a
+    lista (STATUS_LOTE_RECUSADO) o enviador volta a um POST por leitura.
+    Um lote que falha continua pendente e vai junto com o próximo envio (até
+    `max_pendentes` leituras; as mais antigas são descartadas além disso).
+    Leituras que não dá para serializar são descartadas na hora (e passadas
+    para `ao_descartar`), senão travariam os pendentes para sempre.
+    """
+
+    def __init__(self, endpoint: str = ENDPOINT, tamanho_lote: int = TAMANHO_LOTE,
+                 intervalo_envio: float = INTERVALO_ENVIO, max_pendentes: int = MAX_PENDENTES,
+                 timeout: float = TIMEOUT, sessao: requests.Session = None,
+                 formato: str = FORMATO_TEXTO, comprimir: bool = False, em_lote: bool = False,
+                 ao_descartar: Optional[Callable[[List[Dict]], None]] = None, relogio=time.monotonic):
+        if formato not in (FORMATO_TEXTO, FORMATO_BINARIO):
+            raise ValueError(f"Formato de envio desconhecido: {formato}")
+        self.endpoint = endpoint
+        self.formato = formato
+        self.comprimir = comprimir
+        self.em_lote = em_lote
+        self.ao_descartar = ao_descartar
+        self.sessao = sessao or criar_sessao()
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_envio = intervalo_envio
+        self.max_pendentes = max_pendentes
+        self.timeout = timeout
+        self.relogio = relogio
+        self.pendentes: List[Dict] = []
+        self.ultimo_envio = None
+        self.enviados = 0
+        self.descartados = 0
+        self.bytes_enviados = 0
+
+    def adicionar(self, leitura: Dict) -> List[Dict]:
+        """Acrescenta aos pendentes; devolve as leituras antigas descartadas para caber"""
+        self.pendentes.append(leitura)
+        excesso = len(self.pendentes) - self.max_pendentes
+        if excesso <= 0:
+            return []
+        descartadas = self.pendentes[:excesso]
+        del self.pendentes[:excesso]
+        self.descartados += excesso
+        logger.warning("Fila de envio cheia: %d leitura(s) antiga(s) descartada(s)", excesso)
+        return descartadas
+
+    def hora_de_enviar(self) -> bool:
+        if not self.pendentes:
+            return False
+        if len(self.pendentes) >= self.tamanho_lote or self.ultimo_envio is None:
+            return True
+        return self.relogio() - self.ultimo_envio >= self.intervalo_envio
+
+    def _postar(self, lote: List[Dict]) -> requests.Response:
+        corpo, cabecalhos = serializar(lote, self.formato, self.comprimir, self.em_lote)
+        self.bytes_enviados += len(corpo)
+        return self.sessao.post(self.endpoint, data=corpo, headers=cabecalhos, timeout=self.timeout)
+
+    def enviar(self, forcar: bool = False) -> int:
+        """Envia os pendentes em lotes de `tamanho_lote`; devolve quantas leituras foram aceitas"""
+        if not (forcar or self.hora_de_enviar()):
+            return 0
+        self.ultimo_envio = self.relogio()
+        aceitas = 0
+        while self.pendentes:
+            lote = self.pendentes[:self.tamanho_lote]
+            if not self.postar_lote(lote):
+                break
+            del self.pendentes[:len(lote)]
+            aceitas += len(lote)
+        if aceitas:
+            print(f"  ✅ Enviado para API: {aceitas} leitura(s)")
+        return aceitas
+
+    def postar_lote(self, lote: List[Dict]) -> bool:
+        """
+        Envia o lote (um POST, ou um por leitura no texto sem em_lote); True
+        se a API aceitou tudo. Se parar no meio, o lote inteiro é reenviado
+        depois: o storeOrUpdate grava a última leitura, repetir não duplica.
+        """
+        if self.formato == FORMATO_TEXTO and not self.em_lote:
+            return all(self._postar_conferido([leitura]) for leitura in lote)
+        return self._postar_conferido(lote)
+
+    def _postar_conferido(self, lote: List[Dict]) -> bool:
+        try:
+            response = self._postar(lote)
+        except requests.RequestException as e:
+            print(f"  ❌ Erro no envio para API: {e}")
+            return False
+        except ERROS_CODIFICACAO as e:
+            return self._postar_codificaveis(lote, e)
+        if response.status_code in STATUS_LOTE_RECUSADO and self.formato == FORMATO_TEXTO and self.em_lote:
+            logger.warning("API recusou a lista JSON (%d): passando a um POST por leitura", response.status_code)
+            self.em_lote = False
+            return self.postar_lote(lote)
+        if response.status_code != 200:
+            print(f"  ⚠️ Falha ao enviar lote de {len(lote)} -> {response.status_code} {response.text}")
+            return False
+        self.enviados += len(lote)
+        return True
+
+    def _postar_codificaveis(self, lote: List[Dict], erro: Exception) -> bool:
+        """Descarta do lote as leituras que não serializam e envia o resto"""
+        validas, invalidas = [], []
+        for leitura in lote:
+            try:
+                serializar([leitura], self.formato)
+                validas.append(leitura)
+            except ERROS_CODIFICACAO:
+                invalidas.append(leitura)
+        if not invalidas:
+            # Cada uma serializa, só o lote junto não: vai uma por POST
+            return all(self._postar_conferido([leitura]) for leitura in lote)
+        self.descartados += len(invalidas)
+        logger.error("%d leitura(s) impossível(is) de serializar descartada(s): %s", len(invalidas), erro)
+        if self.ao_descartar is not None:
+            self.ao_descartar(invalidas)
+        return not validas or self._postar_conferido(validas)
+
+    def estatisticas(self) -> Dict[str, float]:
+        return {"enviados": self.enviados, "descartados": self.descartados, "pendentes": len(self.pendentes),
+                "bytes_enviados": self.bytes_enviados, **estatisticas_conexoes(self.sessao)}
+
+
+class EnvioEmSegundoPlano:
+    """
+    Desacopla a leitura Modbus do envio HTTP.
+
+    A thread de leitura só chama `entregar()`, que coloca a leitura numa
+    fila limitada e volta na hora; uma thread de envio esvazia a fila para
+    o EnviadorLotes. Uma API lenta ou fora do ar não atrasa o ciclo de
+    leitura: quando a fila enche, vale a `politica` escolhida.
+
+    Com uma `caixa` (CaixaSaida), a thread de envio grava cada leitura no
+    disco assim que a tira da fila e só a apaga quando a API confirma. O
+    acumulado de uma queda é reenviado em lotes de `tamanho_lote_reenvio`,
+    limitado a `vazao_maxima` leituras/s.
+
+    Toda leitura que se perde sem chegar à API (política da fila,
+    `max_pendentes`, caixa cheia ou impossível de serializar) é passada para `ao_descartar`, chamado
+    na thread que descartou.
+    """
+
+    _FIM = object()
+
+    def __init__(self, enviador: EnviadorLotes, tamanho_fila: int = TAMANHO_FILA,
+                 politica: str = DESCARTAR_ANTIGA, espera_bloqueio: float = 5,
+                 espera_reenvio: float = ESPERA_REENVIO, caixa: Optional[CaixaSaida] = None,
+                 tamanho_lote_reenvio: int = TAMANHO_LOTE_REENVIO, vazao_maxima: float = VAZAO_MAXIMA,
+                 ao_descartar: Optional[Callable[[List[Dict]], None]] = None):
+        if politica not in (DESCARTAR_ANTIGA, DESCARTAR_NOVA, BLOQUEAR):
+            raise ValueError(f"Política de fila desconhecida: {politica}")
+        self.enviador = enviador
+        self.politica = politica
+        self.espera_bloqueio = espera_bloqueio
+        self.espera_reenvio = espera_reenvio
+        self.caixa = caixa
+        self.tamanho_lote_reenvio = tamanho_lote_reenvio
+        self.vazao_maxima = vazao_maxima
+        self.ao_descartar = ao_descartar
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.profundidade_maxima = 0
+        self.descartados_fila = 0
+        if enviador.ao_descartar is None:
+            enviador.ao_descartar = self._descartadas
+        self._thread = threading.Thread(target=self._trabalhar, name="envio-api", daemon=True)
+        self._thread.start()
+
+    def _descartadas(self, leituras: List[Dict]):
+        if leituras and self.ao_descartar is not None:
+            self.ao_descartar(leituras)
+
+    def entregar(self, estacao: int, dados: Dict[str, float]) -> bool:
+        """Entrega uma leitura para envio; devolve True se *esta* leitura entrou na fila"""
+        item = nova_leitura(estacao, dados)
+        try:
+            if self.politica == BLOQUEAR:
+                self.fila.put(item, timeout=self.espera_bloqueio)
+            else:
+                self.fila.put_nowait(item)
+            aceito = True
+        except queue.Full:
+            aceito = False
+            descartada = item
+            if self.politica == DESCARTAR_ANTIGA:
+                try:
+                    descartada = self.fila.get_nowait()
+                except queue.Empty:
+                    descartada = None
+                try:
+                    self.fila.put_nowait(item)
+                    aceito = True
+                except queue.Full:
+                    descartada = item
+            self.descartados_fila += 1
+            self._descartadas([descartada] if descartada not in (None, self._FIM) else [])
+            logger.warning("Fila de envio cheia (%d): leitura %s descartada", self.fila.maxsize,
+                           "mais antiga" if self.politica == DESCARTAR_ANTIGA else f"da estação {estacao}")
+        self.profundidade_maxima = max(self.profundidade_maxima, self.fila.qsize())
+        return aceito
+
+    def profundidade(self) -> int:
+        return self.fila.qsize()
+
+    def _trabalhar(self):
+        if self.caixa is not None:
+            return self._trabalhar_com_caixa()
+        while True:
+            try:
+                item = self.fila.get(timeout=self.espera_reenvio)
+            except queue.Empty:
+                # Nada novo: tenta de novo o que ficou pendente
+                if self.enviador.pendentes:
+                    self.enviador.enviar(forcar=True)
+                continue
+            # Junta tudo que já chegou (o ciclo inteiro) antes de enviar
+            while item is not self._FIM:
+                self._descartadas(self.enviador.adicionar(item))
+                try:
+                    item = self.fila.get_nowait()
+                except queue.Empty:
+                    break
+            self.enviador.enviar(forcar=item is self._FIM)
+            if item is self._FIM:
+                return
+
+    def _esvaziar_fila(self, item=None):
+        """Grava na caixa tudo que está na fila (a começar por `item`, se houver)"""
+        leituras = []
+        while True:
+            if item is None:
+                try:
+                    item = self.fila.get_nowait()
+                except queue.Empty:
+                    break
+            if item is self._FIM:
+                self._parando = True
+            else:
+                leituras.append(item)
+            item = None
+        if leituras:
+            self._descartadas(self.caixa.guardar(leituras))
+
+    def _drenar_caixa(self) -> bool:
+        """Envia a caixa em lotes até esvaziar; False se a API recusou (tentar mais tarde)"""
+        enviadas = 0
+        inicio = time.monotonic()
+        while True:
+            # Leituras novas vão para o disco antes de cada lote
+            self._esvaziar_fila()
+            tamanho = self.enviador.tamanho_lote if enviadas == 0 else self.tamanho_lote_reenvio
+            ultimo_id, lote = self.caixa.proximas(tamanho)
+            if not lote:
+                break
+            if not self.enviador.postar_lote(lote):
+                return False
+            self.caixa.confirmar(ultimo_id)
+            enviadas += len(lote)
+            # Limite de vazão: não passa de vazao_maxima leituras/s na média
+            atraso = enviadas / self.vazao_maxima - (time.monotonic() - inicio)
+            if atraso > 0:
+                time.sleep(atraso)
+        if enviadas:
+            print(f"  ✅ Enviado para API: {enviadas} leitura(s) em {time.monotonic() - inicio:.1f} s")
+        return True
+
+    def _trabalhar_com_caixa(self):
+        self._parando = False
+        ok = True
+        while not self._parando:
+            # Com acumulado na caixa, acorda de tempos em tempos para tentar de novo
+            espera = None if ok and not self.caixa.pendentes() else self.espera_reenvio
+            try:
+                item = self.fila.get(timeout=espera)
+            except queue.Empty:
+                item = None
+            self._esvaziar_fila(item)
+            ok = self._drenar_caixa()
+
+    def parar(self, timeout: float = None):
+        """Envia o que restou e encerra a thread de envio"""
+        self.fila.put(self._FIM)
+        self._thread.join(timeout)
+
+    def estatisticas(self) -> Dict[str, float]:
+        estatisticas = {"fila": self.profundidade(), "fila_max": self.profundidade_maxima,
+                        "descartados_fila": self.descartados_fila, **self.enviador.estatisticas()}
+        if self.caixa is not None:
+            estatisticas.update(caixa=self.caixa.pendentes(), caixa_idade_s=round(self.caixa.mais_antiga()),
+                                caixa_descartadas=self.caixa.descartadas)
+        return estatisticas
@@ -0,0 +1,111 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (menor = executa antes)
+URGENTE = 0
+NORMAL = 1
+BAIXA = 2
+
+
+@dataclass(order=True)
+class Comando:
+    """Escrita pendente no barramento; `executar` roda na thread dona da porta"""
+    prioridade: int
+    sequencia: int
+    descricao: str = field(compare=False)
+    executar: Callable[[], Any] = field(compare=False, repr=False)
+    ao_concluir: Optional[Callable[["Comando"], None]] = field(default=None, compare=False, repr=False)
+    enfileirado_em: float = field(default_factory=time.monotonic, compare=False)
+    concluido_em: Optional[float] = field(default=None, compare=False)
+    resultado: Any = field(default=None, compare=False)
+    erro: Optional[BaseException] = field(default=None, compare=False)
+    _concluido: threading.Event = field(default_factory=threading.Event, compare=False, repr=False)
+
+    @property
+    def ok(self) -> bool:
+        return self.concluido_em is not None and self.erro is None
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até o comando ser executado; devolve False se o timeout vencer"""
+        return self._concluido.wait(timeout)
+
+
+class FilaComandos:
+    """
+    Fila de comandos (calibração, zeragem) de um barramento.
+
+    Qualquer thread pode enviar comandos; só a thread que está usando a porta
+    os executa, nos intervalos entre transações de leitura, por ordem de
+    prioridade e depois de chegada. Assim o comando nunca disputa a porta
+    serial com a leitura.
+    """
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self._heap: List[Comando] = []
+        self._sequencia = itertools.count()
+        self._condicao = threading.Condition()
+        self.executados = 0
+        self.falhas = 0
+
+    def enviar(self, descricao: str, executar: Callable[[], Any], prioridade: int = NORMAL,
+               ao_concluir: Optional[Callable[[Comando], None]] = None) -> Comando:
+        """Enfileira um comando e devolve-o (use `esperar()` para bloquear até a execução)"""
+        comando = Comando(prioridade, next(self._sequencia), descricao, executar, ao_concluir)
+        with self._condicao:
+            heapq.heappush(self._heap, comando)
+            self._condicao.notify()
+        logger.info("Barramento %s: comando enfileirado (%s), %d pendente(s)", self.nome, descricao, len(self._heap))
+        return comando
+
+    def pendentes(self) -> int:
+        with self._condicao:
+            return len(self._heap)
+
+    def executar_proximo(self) -> Optional[Comando]:
+        """Executa o comando mais prioritário, se houver (chamar com a porta livre)"""
+        with self._condicao:
+            if not self._heap:
+                return None
+            comando = heapq.heappop(self._heap)
+        self._executar(comando)
+        return comando
+
+    def executar_ate(self, prazo: float, relogio=time.monotonic) -> int:
+        """Usa o tempo ocioso até `prazo` executando comandos conforme chegam"""
+        executados = 0
+        while True:
+            with self._condicao:
+                while not self._heap:
+                    restante = prazo - relogio()
+                    if restante <= 0:
+                        return executados
+                    self._condicao.wait(restante)
+                if relogio() >= prazo:
+                    return executados
+                comando = heapq.heappop(self._heap)
+            self._executar(comando)
+            executados += 1
+
+    def _executar(self, comando: Comando):
+        try:
+            comando.resultado = comando.executar()
+            self.executados += 1
+        except Exception as e:
+            comando.erro = e
+            self.falhas += 1
+            logger.warning("Barramento %s: comando falhou (%s): %s", self.nome, comando.descricao, e)
+        comando.concluido_em = time.monotonic()
+        comando._concluido.set()
+        if comando.ao_concluir is not None:
+            try:
+                comando.ao_concluir(comando)
+            except Exception:
+                logger.exception("Barramento %s: erro no callback de %s", self.nome, comando.descricao)
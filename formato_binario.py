@@ -0,0 +1,124 @@
+import gzip
+import logging
+import math
+import struct
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Formato colunar para o storeOrUpdate (alternativa ao texto "T:..|H:..")
+#
+#   cabeçalho  >BHI   versão do esquema, nº de leituras, instante base (epoch s)
+#   colunas    >H     estação (slave id)
+#              >I     segundos desde o instante base
+#              >H     campos presentes (bit i = CAMPOS[i]; versão 2 em diante)
+#              >h/>H/>I  um valor bruto por campo de CAMPOS, na ordem
+#                     (0 quando o campo não está presente; >I só na versão 3:
+#                     antes todos os campos eram >h/>H)
+#
+# Cada coluna traz os valores de todas as leituras em sequência: valores
+# parecidos ficam juntos e o gzip comprime bem quando o lote é grande.
+# Campos ausentes vêm do envio por exceção (banda_morta.py): o servidor
+# mantém o último valor recebido. Valores fora da faixa da coluna são
+# saturados no limite dela; NaN/infinito vão como campo ausente.
+VERSAO_ESQUEMA = 3
+TIPO_CONTEUDO = "application/x-estacoes-colunar"
+
+# Campo → (escala do valor enviado pela estação, com sinal, tipo da coluna)
+# valor = bruto * escala; vento_velocidade é guardado em 0.01 m/s e lido em km/h;
+# iluminancia vai até 200000 lux (dois registradores na estação): 32 bits
+CAMPOS: Tuple[Tuple[str, float, bool, str], ...] = (
+    ("temperatura",      0.1,   True,  "H"),
+    ("umidade",          0.1,   False, "H"),
+    ("pressao",          1,     False, "H"),
+    ("ruido",            0.1,   False, "H"),
+    ("iluminancia",      1,     False, "I"),
+    ("chuva",            0.1,   False, "H"),
+    ("vento_velocidade", 0.036, False, "H"),
+    ("vento_direcao",    1,     False, "H"),
+    ("pm25",             1,     False, "H"),
+    ("pm10",             1,     False, "H"),
+)
+
+_CABECALHO = struct.Struct(">BHI")
+
+
+def _formato_coluna(n: int, signed: bool, tipo: str = "H") -> str:
+    return f">{n}{tipo.lower() if signed else tipo}"
+
+
+def _faixa(signed: bool, tipo: str) -> Tuple[int, int]:
+    """Menor e maior valor bruto que cabem na coluna"""
+    bits = 8 * struct.calcsize(f">{tipo}")
+    return (-(1 << bits - 1), (1 << bits - 1) - 1) if signed else (0, (1 << bits) - 1)
+
+
+def codificar(leituras: List[Dict], comprimir: bool = False) -> bytes:
+    """
+    Codifica leituras {"estacao", "momento" (epoch s), "dados": {campo: valor}}
+    num único bloco binário (gzip opcional). Levanta struct.error/ValueError/
+    TypeError se uma leitura não couber (estação ou instante inválidos).
+    """
+    n = len(leituras)
+    base = int(min((l["momento"] for l in leituras), default=0))
+    presentes = [0] * n
+    colunas = []
+    saturados = 0
+    for i, (nome, escala, signed, tipo) in enumerate(CAMPOS):
+        minimo, maximo = _faixa(signed, tipo)
+        brutos = [0] * n
+        for j, leitura in enumerate(leituras):
+            valor = leitura["dados"].get(nome)
+            if valor is None or not math.isfinite(valor):
+                continue
+            bruto = round(valor / escala)
+            if not minimo <= bruto <= maximo:
+                bruto = min(max(bruto, minimo), maximo)
+                saturados += 1
+            brutos[j] = bruto
+            presentes[j] |= 1 << i
+        colunas.append(struct.pack(_formato_coluna(n, signed, tipo), *brutos))
+    if saturados:
+        logger.warning("%d valor(es) fora da faixa da coluna saturado(s) no limite", saturados)
+    partes = [
+        _CABECALHO.pack(VERSAO_ESQUEMA, n, base),
+        struct.pack(_formato_coluna(n, False), *(l["estacao"] for l in leituras)),
+        struct.pack(_formato_coluna(n, False, "I"), *(int(l["momento"]) - base for l in leituras)),
+        struct.pack(_formato_coluna(n, False), *presentes),
+        *colunas,
+    ]
+    corpo = b"".join(partes)
+    return gzip.compress(corpo, compresslevel=6) if comprimir else corpo
+
+
+def decodificar(corpo: bytes) -> List[Dict]:
+    """Inverso de `codificar` (aceita o corpo comprimido ou não)"""
+    if corpo[:2] == b"\x1f\x8b":
+        corpo = gzip.decompress(corpo)
+    versao, n, base = _CABECALHO.unpack_from(corpo, 0)
+    if versao not in (1, 2, VERSAO_ESQUEMA):
+        raise ValueError(f"Versão de esquema {versao} não suportada (esperada até {VERSAO_ESQUEMA})")
+    posicao = _CABECALHO.size
+
+    def coluna(signed, tipo="H"):
+        nonlocal posicao
+        formato = _formato_coluna(n, signed, tipo)
+        valores = struct.unpack_from(formato, corpo, posicao)
+        posicao += struct.calcsize(formato)
+        return valores
+
+    estacoes = coluna(False)
+    deslocamentos = coluna(False, "I")
+    # Versão 1 não tinha a coluna de presença: todos os campos vinham
+    presentes = coluna(False) if versao >= 2 else (2 ** len(CAMPOS) - 1,) * n
+    # Até a versão 2 todas as colunas de campo eram de 16 bits
+    colunas = [(1 << i, nome, escala, coluna(signed, tipo if versao >= 3 else "H"))
+               for i, (nome, escala, signed, tipo) in enumerate(CAMPOS)]
+    return [
+        {
+            "estacao": estacoes[i],
+            "momento": base + deslocamentos[i],
+            "dados": {nome: valores[i] * escala for bit, nome, escala, valores in colunas if presentes[i] & bit},
+        }
+        for i in range(n)
+    ]
@@ -0,0 +1,144 @@
+import argparse
+import json
+import sys
+import time
+
+import serial
+
+from Id_Station import sondar, timeout_sonda
+from modbus_rtu import ErroModbus, escrever_registro, ler_registros
+from registro_estacoes import carregar_registro, ids_conhecidos
+
+# Porta serial (o plano pode sobrescrever)
+PORTA = "COM15"
+BAUDRATE = 4800
+TIMEOUT = 1
+
+REGISTER_ADDR = 0x07D0  # Endereço do registrador de Slave ID
+
+# Ajustes persistentes: chave do plano → registrador (conferidos lendo de volta)
+AJUSTES = {
+    "offset_vento": 0x6000,   # 0 = normal, 1 = invertido 180°
+}
+
+# Comandos de calibração: chave do plano → (registrador, valor); só o eco é conferido
+COMANDOS = {
+    "zerar_vento": (0x6001, 0xAA),
+    "zerar_chuva": (0x6002, 0x5A),
+}
+
+# Tempo para o dispositivo passar a responder no novo ID
+ESPERA_TROCA_ID = 0.2  # segundos
+
+# Faixa de endereços Modbus válidos para escravos
+PRIMEIRO_ID = 1
+ULTIMO_ID = 247
+
+
+def validar_plano(dispositivos, ocupados):
+    """
+    Erros do plano que deixariam dois escravos no mesmo endereço (lista vazia = ok).
+
+    `ocupados` são os IDs em uso no barramento (varredura + os do plano). Um
+    novo_id não pode ser um ID ocupado, nem mesmo de um dispositivo que também
+    será renumerado: a troca é feita em sequência, então trocas (A→B, B→A) e
+    cadeias (A→B, B→C) passam por um momento com dois escravos no mesmo ID.
+    Faça em duas etapas, por um ID livre.
+    """
+    erros = []
+    vistos = set()
+    for dispositivo in dispositivos:
+        if dispositivo["id"] in vistos:
+            erros.append(f"Estação {dispositivo['id']} aparece mais de uma vez no plano")
+        vistos.add(dispositivo["id"])
+    destinos = {}
+    for dispositivo in dispositivos:
+        slave_id, novo_id = dispositivo["id"], dispositivo.get("novo_id")
+        if novo_id is None or novo_id == slave_id:
+            continue
+        if not PRIMEIRO_ID <= novo_id <= ULTIMO_ID:
+            erros.append(f"Estação {slave_id}: novo_id {novo_id} fora da faixa {PRIMEIRO_ID}–{ULTIMO_ID}")
+        elif novo_id in destinos:
+            erros.append(f"Estações {destinos[novo_id]} e {slave_id} com o mesmo novo_id {novo_id}")
+        elif novo_id in ocupados:
+            erros.append(f"Estação {slave_id}: novo_id {novo_id} já está em uso no barramento")
+        destinos.setdefault(novo_id, slave_id)
+    return erros
+
+
+def escrever_conferindo(ser, slave_id, addr, valor, id_leitura=None):
+    """Escreve o registrador e lê de volta (no novo ID, se for troca de ID)"""
+    escrever_registro(ser, slave_id, addr, valor)
+    if id_leitura is not None:
+        time.sleep(ESPERA_TROCA_ID)
+    lido = ler_registros(ser, id_leitura or slave_id, addr, 1)[0]
+    if lido != valor:
+        raise ErroModbus(f"Registrador 0x{addr:04X} do escravo {slave_id}: escrito {valor}, lido {lido}")
+
+
+def provisionar(ser, dispositivo):
+    """Aplica um item do plano; a troca de ID fica por último"""
+    slave_id = dispositivo["id"]
+    feitos = []
+    for chave, addr in AJUSTES.items():
+        if chave in dispositivo:
+            escrever_conferindo(ser, slave_id, addr, dispositivo[chave])
+            feitos.append(f"{chave}={dispositivo[chave]}")
+    for chave, (addr, valor) in COMANDOS.items():
+        if dispositivo.get(chave):
+            escrever_registro(ser, slave_id, addr, valor)
+            feitos.append(chave)
+    novo_id = dispositivo.get("novo_id")
+    if novo_id is not None and novo_id != slave_id:
+        escrever_conferindo(ser, slave_id, REGISTER_ADDR, novo_id, id_leitura=novo_id)
+        feitos.append(f"id {slave_id}→{novo_id}")
+    return feitos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provisionamento em lote de IDs e calibração das estações")
+    parser.add_argument("plano", help="arquivo JSON com o plano (veja provisionamento_exemplo.json)")
+    args = parser.parse_args()
+
+    with open(args.plano, encoding="utf-8") as f:
+        plano = json.load(f)
+
+    porta = plano.get("porta", PORTA)
+    baudrate = plano.get("baudrate", BAUDRATE)
+    dispositivos = plano["dispositivos"]
+    resultados = []
+    with serial.Serial(port=porta, baudrate=baudrate, bytesize=8, parity="N", stopbits=1, timeout=TIMEOUT) as ser:
+        # Antes de escrever qualquer coisa: os IDs de destino têm de estar livres.
+        # Ocupados = última varredura (estacoes.json) + IDs do plano + quem responder agora
+        ocupados = set(ids_conhecidos(carregar_registro(), porta)) | {d["id"] for d in dispositivos}
+        ser.timeout = timeout_sonda(baudrate)
+        for novo_id in {d.get("novo_id") for d in dispositivos} - ocupados - {None}:
+            if sondar(ser, novo_id) is not None:
+                ocupados.add(novo_id)
+        ser.timeout = TIMEOUT
+        erros = validar_plano(dispositivos, ocupados)
+        if erros:
+            print("❌ Plano recusado, nada foi escrito:")
+            for erro in erros:
+                print(f"  • {erro}")
+            sys.exit(1)
+
+        print(f"🔧 Provisionando {len(dispositivos)} dispositivo(s) em {porta} @ {baudrate} baud")
+        for dispositivo in dispositivos:
+            inicio = time.perf_counter()
+            try:
+                feitos = provisionar(ser, dispositivo)
+                ok, detalhe = True, ", ".join(feitos) or "nada a fazer"
+            except ErroModbus as e:
+                ok, detalhe = False, str(e)
+            duracao = time.perf_counter() - inicio
+            resultados.append(ok)
+            print(f"  {'✅' if ok else '❌'} Estação {dispositivo['id']:3d} ({duracao * 1e3:6.0f} ms): {detalhe}")
+
+    print(f"📋 {sum(resultados)}/{len(resultados)} dispositivo(s) provisionados com sucesso")
+    if any(d.get("novo_id") for d in dispositivos):
+        print("ℹ️ IDs alterados: rode Id_Station.py para atualizar o registro de estações.")
+
+
+if __name__ == "__main__":
+    main()
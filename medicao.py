@@ -0,0 +1,20 @@
+import os
+import subprocess
+
+# Utilitários comuns dos benchmarks (bench_barramento.py, bench_api.py): só
+# biblioteca padrão, para cada bench rodar sem as dependências dos outros
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def revisao_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PASTA,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
+import serial_asyncio
+
+from modbus_rtu import ErroModbus, RespostaInvalida, SemResposta, conferir_resposta, montar_comando, tamanho_quadro
+
+# Configurações da porta serial
+PORTA = "COM15"      # No Linux: /dev/ttyUSB0
+BAUDRATE = 4800
+TIMEOUT = 1
+
+
+def intervalo_silencio(baudrate: int, bits_por_caractere: int = 11) -> float:
+    """
+    Intervalo t3.5 (s) que marca o fim de um frame RTU: 3,5 caracteres de
+    silêncio no barramento. Acima de 19200 baud a norma fixa 1,75 ms.
+    """
+    if baudrate > 19200:
+        return 0.00175
+    return 3.5 * bits_por_caractere / baudrate
+
+
+class MestreRTU(asyncio.Protocol):
+    """Mestre Modbus RTU não bloqueante sobre um transporte serial asyncio"""
+
+    def __init__(self, baudrate: int = BAUDRATE, timeout: float = TIMEOUT, silencio: Optional[float] = None):
+        self.baudrate = baudrate
+        self.timeout = timeout
+        # O t3.5 só fecha frames que já não podem ser a resposta esperada (lixo,
+        # outro escravo/função); um começo de resposta válido é esperado inteiro,
+        # mesmo com os bytes em rajadas (latência de ~16 ms dos adaptadores USB-RS485)
+        self.silencio = silencio if silencio is not None else intervalo_silencio(baudrate)
+        self.transport = None
+        self._buffer = bytearray()
+        self._quadro = None
+        self._escravo = None
+        self._funcao = None
+        self._timer = None
+        self._lock = asyncio.Lock()
+
+    # ---- callbacks do asyncio.Protocol ----
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        if self._quadro is None or self._quadro.done():
+            return  # bytes fora de uma transação (eco, ruído) são descartados
+        self._buffer.extend(data)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        buffer = self._buffer
+        if buffer[0] == self._escravo and (len(buffer) < 2 or buffer[1] & 0x7F == self._funcao):
+            # Começo de resposta válido: com o cabeçalho o tamanho é conhecido e o
+            # frame é esperado inteiro (ou até o timeout da transação), sem t3.5
+            if len(buffer) >= 3 and len(buffer) >= tamanho_quadro(buffer, self._funcao):
+                self._fim_de_quadro()
+            return
+        # Lixo ou resposta de outro escravo/função: o silêncio t3.5 fecha o frame
+        self._timer = asyncio.get_running_loop().call_later(self.silencio, self._fim_de_quadro)
+
+    def connection_lost(self, exc):
+        if self._quadro is not None and not self._quadro.done():
+            self._quadro.set_exception(exc or ConnectionError("Porta serial fechada"))
+
+    def _fim_de_quadro(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._quadro is not None and not self._quadro.done():
+            self._quadro.set_result(bytes(self._buffer))
+
+    # ---- API ----
+    async def transacao(self, requisicao: bytes) -> bytes:
+        """
+        Envia uma requisição e aguarda o frame de resposta (um mestre por vez no
+        barramento). Levanta SemResposta, RespostaInvalida ou ExcecaoModbus.
+        """
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            self._buffer.clear()
+            self._quadro = loop.create_future()
+            self._escravo = requisicao[0]
+            self._funcao = requisicao[1]
+            self.transport.write(requisicao)
+            try:
+                frame = await asyncio.wait_for(self._quadro, self.timeout)
+            except asyncio.TimeoutError:
+                if not self._buffer:
+                    raise SemResposta(f"Sem resposta do escravo {requisicao[0]} em {self.timeout} s") from None
+                frame = bytes(self._buffer)   # começou e não terminou: conferir_resposta acusa o truncado
+            finally:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                self._quadro = None
+                # Garante o silêncio t3.5 antes da próxima requisição
+                await asyncio.sleep(self.silencio)
+            return conferir_resposta(frame, requisicao[0], requisicao[1])
+
+    async def read_registers(self, slave: int, addr: int, count: int = 1) -> List[int]:
+        """Lê `count` registradores (FC03) e devolve os valores brutos de 16 bits"""
+        resp = await self.transacao(montar_comando(slave, addr, count))
+        if resp[2] != 2 * count:
+            raise RespostaInvalida(f"Byte count {resp[2]} inesperado do escravo {slave} (esperado {2 * count})")
+        return [int.from_bytes(resp[i:i + 2], byteorder="big") for i in range(3, 3 + 2 * count, 2)]
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+async def abrir_mestre(porta: str = PORTA, baudrate: int = BAUDRATE, timeout: float = TIMEOUT, **kwargs) -> MestreRTU:
+    """Abre a porta serial em modo não bloqueante e devolve o mestre conectado"""
+    loop = asyncio.get_running_loop()
+    transport, mestre = await serial_asyncio.create_serial_connection(
+        loop, lambda: MestreRTU(baudrate, timeout, **kwargs), porta, baudrate=baudrate
+    )
+    # connection_made é agendado no loop; o transporte já pode ser usado agora
+    mestre.transport = transport
+    return mestre
+
+
+# Exemplo: um único event loop lendo várias estações a cada 3 s
+async def main():
+    mestre = await abrir_mestre()
+    try:
+        while True:
+            print(f"\n📡 Leitura: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            for slave_id in (1, 2, 3):
+                try:
+                    valores = await mestre.read_registers(slave_id, 0x1F4, 14)
+                    print(f"  Estação {slave_id}: {valores}")
+                except ErroModbus as e:
+                    print(f"  Estação {slave_id}: ⚠️ Erro -> {e}")
+            await asyncio.sleep(3)
+    finally:
+        mestre.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+from functools import lru_cache
+from typing import List, Optional
+
+# Códigos de função usados pelas estações
+FC_LER_REGISTROS = 0x03      # Read Holding Registers
+FC_ESCREVER_REGISTRO = 0x06  # Write Single Register
+
+
+# Tabela CRC16 Modbus (polinômio 0xA001), calculada uma única vez
+def _gerar_tabela_crc():
+    tabela = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+        tabela.append(crc)
+    return tuple(tabela)
+
+
+_TABELA_CRC = _gerar_tabela_crc()
+
+
+def crc16(data: bytes) -> int:
+    """CRC16 Modbus por tabela (um lookup por byte em vez de 8 deslocamentos)"""
+    crc = 0xFFFF
+    tabela = _TABELA_CRC
+    for pos in data:
+        crc = (crc >> 8) ^ tabela[(crc ^ pos) & 0xFF]
+    return crc
+
+
+def calcular_crc(data: bytes) -> bytes:
+    """CRC16 Modbus no formato do frame (Lo, Hi)"""
+    return crc16(data).to_bytes(2, byteorder="little")
+
+
+def crc_valido(frame: bytes) -> bool:
+    """Confere o CRC dos dois últimos bytes do frame"""
+    # O CRC de um frame completo (dados + CRC) é sempre zero
+    return len(frame) >= 4 and crc16(frame) == 0
+
+
+@lru_cache(maxsize=1024)
+def montar_requisicao(slave_id: int, funcao: int, addr: int, valor: int) -> bytes:
+    """
+    Frame de requisição com CRC: [slave][função][addr Hi/Lo][valor Hi/Lo][CRC Lo/Hi].
+    Para FC03 o valor é a quantidade de registradores; para FC06, o valor escrito.
+    O frame é imutável, então fica em cache por (slave, função, endereço, valor).
+    """
+    msg = bytes([slave_id, funcao, (addr >> 8) & 0xFF, addr & 0xFF, (valor >> 8) & 0xFF, valor & 0xFF])
+    return msg + calcular_crc(msg)
+
+
+def montar_comando(slave_id: int, addr: int, qtd: int = 1) -> bytes:
+    """Comando Read Holding Registers (FC03)"""
+    return montar_requisicao(slave_id, FC_LER_REGISTROS, addr, qtd)
+
+
+def validar_resposta(resp: bytes, slave_id: int, funcao: int) -> bool:
+    """Confere escravo, função e CRC da resposta"""
+    return len(resp) >= 5 and resp[0] == slave_id and resp[1] == funcao and crc_valido(resp)
+
+
+# ================================
+# LEITURA DA RESPOSTA
+# ================================
+# Códigos de exceção Modbus (resposta com função | 0x80)
+CODIGOS_EXCECAO = {
+    0x01: "função ilegal",
+    0x02: "endereço de registrador ilegal",
+    0x03: "valor ilegal",
+    0x04: "falha no escravo",
+    0x05: "reconhecido, processando",
+    0x06: "escravo ocupado",
+}
+
+
+class ErroModbus(IOError):
+    """Base dos erros de comunicação Modbus"""
+
+
+class SemResposta(ErroModbus):
+    """Nenhum byte recebido dentro do timeout"""
+
+
+class RespostaInvalida(ErroModbus):
+    """Frame truncado, de outro escravo/função ou com CRC errado"""
+
+
+class ExcecaoModbus(ErroModbus):
+    """O escravo respondeu com um código de exceção"""
+
+    def __init__(self, slave_id: int, funcao: int, codigo: int):
+        self.slave_id = slave_id
+        self.funcao = funcao
+        self.codigo = codigo
+        descricao = CODIGOS_EXCECAO.get(codigo, "desconhecida")
+        super().__init__(f"Escravo {slave_id} recusou a função 0x{funcao:02X}: exceção {codigo} ({descricao})")
+
+
+def tamanho_quadro(cabecalho: bytes, funcao: int) -> int:
+    """
+    Tamanho total esperado da resposta a partir dos 3 primeiros bytes:
+    exceção = 5, FC03/FC04 = 5 + byte count, FC06 = 8 (eco da requisição).
+    """
+    if cabecalho[1] == funcao | 0x80:
+        return 5
+    if funcao in (0x03, 0x04):
+        return 5 + cabecalho[2]
+    return 8
+
+
+def conferir_resposta(frame: bytes, slave_id: int, funcao: int) -> bytes:
+    """Valida o frame completo e converte respostas de exceção em ExcecaoModbus"""
+    if not frame:
+        raise SemResposta(f"Sem resposta do escravo {slave_id}")
+    if len(frame) < 5 or frame[0] != slave_id or frame[1] & 0x7F != funcao:
+        raise RespostaInvalida(f"Resposta inesperada do escravo {slave_id}: {frame.hex()}")
+    if len(frame) != tamanho_quadro(frame, funcao) or not crc_valido(frame):
+        raise RespostaInvalida(f"Frame truncado ou CRC inválido do escravo {slave_id}: {frame.hex()}")
+    if frame[1] & 0x80:
+        raise ExcecaoModbus(slave_id, funcao, frame[2])
+    return frame
+
+
+def ler_resposta(ser, slave_id: int, funcao: int, n_bytes: Optional[int] = None) -> bytes:
+    """
+    Lê a resposta pelo cabeçalho: primeiro 3 bytes, depois exatamente o que
+    falta. Retorna assim que o frame fecha, sem esperar o timeout da porta.
+    n_bytes: byte count esperado numa leitura (2 x registradores pedidos)
+    """
+    cabecalho = ser.read(3)
+    if len(cabecalho) < 3 or cabecalho[0] != slave_id or cabecalho[1] & 0x7F != funcao:
+        # Nada recebido ou lixo no barramento: não adianta esperar o resto
+        return conferir_resposta(cabecalho, slave_id, funcao)
+    if n_bytes is not None and cabecalho[1] == funcao and cabecalho[2] != n_bytes:
+        raise RespostaInvalida(f"Byte count {cabecalho[2]} inesperado do escravo {slave_id} (esperado {n_bytes})")
+    restante = tamanho_quadro(cabecalho, funcao) - 3
+    return conferir_resposta(cabecalho + ser.read(restante), slave_id, funcao)
+
+
+def transacao(ser, requisicao: bytes) -> bytes:
+    """Envia uma requisição e devolve a resposta já validada"""
+    ser.reset_input_buffer()
+    ser.write(requisicao)
+    funcao = requisicao[1]
+    n_bytes = 2 * int.from_bytes(requisicao[4:6], byteorder="big") if funcao in (0x03, 0x04) else None
+    return ler_resposta(ser, requisicao[0], funcao, n_bytes)
+
+
+def ler_registros(ser, slave_id: int, addr: int, qtd: int = 1) -> List[int]:
+    """FC03: valores brutos (16 bits, sem sinal) de `qtd` registradores"""
+    resp = transacao(ser, montar_comando(slave_id, addr, qtd))
+    return [int.from_bytes(resp[i:i + 2], byteorder="big") for i in range(3, 3 + 2 * qtd, 2)]
+
+
+def escrever_registro(ser, slave_id: int, addr: int, valor: int):
+    """FC06: escreve um registrador e confere o eco da requisição"""
+    requisicao = montar_requisicao(slave_id, FC_ESCREVER_REGISTRO, addr, valor)
+    resp = transacao(ser, requisicao)
+    if resp != requisicao:
+        raise RespostaInvalida(f"Eco diferente da requisição do escravo {slave_id}: {resp.hex()}")
+
+
+# ================================
+# BAUD RATE
+# ================================
+# Baud rates aceitos pelas estações (registrador 0x07D1), do mais rápido ao mais lento
+BAUDRATES_SUPORTADOS = (9600, 4800, 2400)
+
+
+def detectar_baudrate(ser, slave_ids, candidatos=BAUDRATES_SUPORTADOS) -> Optional[int]:
+    """
+    Descobre o baud rate do barramento sondando o registrador 0x07D0 de alguns
+    escravos em cada candidato, na ordem dada. Deixa a porta no baud rate
+    encontrado; se ninguém responder (ou der erro na porta), restaura o
+    original e devolve None.
+    """
+    baud_original, timeout_original = ser.baudrate, ser.timeout
+    encontrado = None
+    try:
+        for baudrate in candidatos:
+            ser.baudrate = baudrate
+            # Tempo no fio de requisição + resposta, com folga para o dispositivo
+            ser.timeout = (8 + 7) * 11 / baudrate + 0.05
+            for slave_id in slave_ids:
+                try:
+                    transacao(ser, montar_comando(slave_id, 0x07D0, 1))
+                    encontrado = baudrate
+                    return encontrado
+                except ErroModbus:
+                    continue
+        return None
+    finally:
+        if encontrado is None:
+            ser.baudrate = baud_original
+        ser.timeout = timeout_original
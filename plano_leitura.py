@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from modbus_rtu import ErroModbus, montar_comando, transacao
+
+# Limite de registradores por leitura FC03 (Modbus: 125 registradores)
+MAX_REGISTROS = 125
+
+
+@dataclass(frozen=True)
+class Campo:
+    """Um sensor dentro de um bloco: nome, deslocamento no bloco, escala e sinal"""
+    nome: str
+    offset: int
+    escala: float
+    signed: bool = False
+
+
+@dataclass(frozen=True)
+class Bloco:
+    """Uma leitura FC03 contínua que cobre vários sensores"""
+    inicio: int
+    quantidade: int
+    campos: Tuple[Campo, ...]
+
+
+def compilar_plano(sensores: Dict[str, tuple], max_lacuna: int = 0,
+                   max_registros: int = MAX_REGISTROS) -> List[Bloco]:
+    """
+    Agrupa o mapa de registradores em blocos de leitura contínua.
+
+    sensores: {nome: (endereco, escala)} ou {nome: (endereco, escala, signed)}
+    max_lacuna: quantos registradores não usados podem ser lidos "de graça"
+                para juntar dois blocos (0 = só endereços adjacentes)
+    """
+    itens = []
+    for nome, spec in sensores.items():
+        addr, escala = spec[0], spec[1]
+        signed = spec[2] if len(spec) > 2 else False
+        itens.append((addr, nome, escala, signed))
+    itens.sort(key=lambda item: item[0])
+
+    plano = []
+    grupo = []
+    for item in itens:
+        if grupo:
+            inicio = grupo[0][0]
+            ultimo = grupo[-1][0]
+            if item[0] - ultimo - 1 > max_lacuna or item[0] - inicio + 1 > max_registros:
+                plano.append(_fechar_bloco(grupo))
+                grupo = []
+        grupo.append(item)
+    if grupo:
+        plano.append(_fechar_bloco(grupo))
+    return plano
+
+
+def _fechar_bloco(grupo) -> Bloco:
+    inicio = grupo[0][0]
+    campos = tuple(Campo(nome, addr - inicio, escala, signed) for addr, nome, escala, signed in grupo)
+    return Bloco(inicio, grupo[-1][0] - inicio + 1, campos)
+
+
+def decodificar_bloco(bloco: Bloco, dados: bytes) -> Dict[str, float]:
+    """Converte o payload (sem cabeçalho/CRC) de um bloco em valores escalados"""
+    valores = {}
+    for campo in bloco.campos:
+        pos = 2 * campo.offset
+        bruto = int.from_bytes(dados[pos:pos + 2], byteorder="big", signed=campo.signed)
+        valores[campo.nome] = bruto * campo.escala
+    return valores
+
+
+def ler_bloco(ser, slave_id: int, bloco: Bloco) -> Dict[str, float]:
+    """Lê um bloco inteiro com uma única transação FC03 (levanta ErroModbus se falhar)"""
+    resp = transacao(ser, montar_comando(slave_id, bloco.inicio, bloco.quantidade))
+    return decodificar_bloco(bloco, resp[3:-2])
+
+
+def ler_plano(ser, slave_id: int, plano: List[Bloco]) -> Dict[str, Optional[float]]:
+    """Executa o plano completo; sensores de blocos que falharam ficam como None"""
+    valores = {}
+    for bloco in plano:
+        try:
+            lidos = ler_bloco(ser, slave_id, bloco)
+        except ErroModbus:
+            lidos = None
+        for campo in bloco.campos:
+            valores[campo.nome] = lidos[campo.nome] if lidos else None
+    return valores
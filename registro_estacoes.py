@@ -0,0 +1,82 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+# Arquivo gerado pela varredura do barramento (Id_Station.py)
+ARQUIVO_REGISTRO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "estacoes.json")
+
+# Valores do registrador 0x07D1 (manual: 0 = 2400, 1 = 4800, 2 = 9600)
+CODIGOS_BAUDRATE = {0: 2400, 1: 4800, 2: 9600}
+
+
+def carregar_registro(caminho: str = ARQUIVO_REGISTRO) -> Dict[str, dict]:
+    """
+    Lê o registro de estações: {porta: {"baudrate", "varredura", "estacoes": [...]}}.
+    Retorna {} se a varredura ainda não foi feita.
+    """
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_registro(registro: Dict[str, dict], caminho: str = ARQUIVO_REGISTRO):
+    """Grava o registro de forma atômica (arquivo temporário + rename)"""
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(registro, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def atualizar_barramento(registro: Dict[str, dict], porta: str, baudrate: int, estacoes: List[dict]):
+    """Substitui o resultado de um barramento mantendo os outros (e o "codigo" já atribuído)"""
+    anteriores = {e["id"]: e["codigo"] for e in registro.get(porta, {}).get("estacoes", []) if "codigo" in e}
+    estacoes = [dict(e, codigo=anteriores[e["id"]]) if e["id"] in anteriores and "codigo" not in e else e
+                for e in estacoes]
+    registro[porta] = {
+        "baudrate": baudrate,
+        "varredura": datetime.now().isoformat(timespec="seconds"),
+        "estacoes": sorted(estacoes, key=lambda e: e["id"]),
+    }
+
+
+def ids_conhecidos(registro: Dict[str, dict], porta: str) -> List[int]:
+    """IDs vistos na última varredura da porta, do mais rápido ao mais lento"""
+    estacoes = registro.get(porta, {}).get("estacoes", [])
+    return [e["id"] for e in sorted(estacoes, key=lambda e: e.get("latencia_ms") or 0)]
+
+
+def barramentos_do_registro(registro: Dict[str, dict]) -> Dict[str, List[int]]:
+    """
+    Mapa porta → IDs no formato usado pelos pollers (BARRAMENTOS). Os mesmos
+    IDs podem aparecer em portas diferentes: os pollers chaveiam por
+    (porta, id) e `codigos_api` recusa números repetidos na API.
+    """
+    return {porta: [e["id"] for e in info["estacoes"]] for porta, info in registro.items() if info.get("estacoes")}
+
+
+def codigos_api(registro: Dict[str, dict], barramentos: Dict[str, List[int]]) -> Dict[Tuple[str, int], int]:
+    """
+    Número de cada estação (porta, slave ID) na API ("Estação N"): o campo
+    "codigo" da estação no registro ou, sem ele, o próprio slave ID.
+
+    Slave IDs só são únicos dentro de um barramento; se dois barramentos têm
+    o mesmo ID sem "codigo" distinto, as leituras iriam para a mesma estação
+    na API, então a configuração é recusada.
+    """
+    codigos = {}
+    donos: Dict[int, List[Tuple[str, int]]] = {}
+    for porta, ids in barramentos.items():
+        definidos = {e["id"]: e["codigo"] for e in registro.get(porta, {}).get("estacoes", []) if "codigo" in e}
+        for slave_id in ids:
+            codigo = definidos.get(slave_id, slave_id)
+            codigos[(porta, slave_id)] = codigo
+            donos.setdefault(codigo, []).append((porta, slave_id))
+    repetidos = {codigo: lista for codigo, lista in donos.items() if len(lista) > 1}
+    if repetidos:
+        detalhes = "; ".join(f"Estação {codigo}: " + ", ".join(f"{porta} ID {i}" for porta, i in lista)
+                             for codigo, lista in sorted(repetidos.items()))
+        raise ValueError(f"Estações com o mesmo número em barramentos diferentes ({detalhes}). "
+                         f"Defina \"codigo\" distinto para elas em {os.path.basename(ARQUIVO_REGISTRO)}.")
+    return codigos
@@ -0,0 +1,336 @@
+import argparse
+import logging
+import os
+import random
+import select
+import termios
+import threading
+import time
+import tty
+from typing import Dict, List, Optional
+
+from modbus_rtu import calcular_crc, crc_valido
+
+logger = logging.getLogger(__name__)
+
+# Registradores de medição (manual): 0x1F4–0x201 e irradiância solar em 0x204
+REG_MEDICOES = range(0x1F4, 0x205)
+REG_SLAVE_ID = 0x07D0
+REG_BAUDRATE = 0x07D1
+REG_OFFSET_VENTO = 0x6000
+REG_ZERAR_VENTO = 0x6001
+REG_ZERAR_CHUVA = 0x6002
+
+CODIGOS_BAUDRATE = {0: 2400, 1: 4800, 2: 9600}
+VELOCIDADES_TERMIOS = {getattr(termios, f"B{b}"): b for b in (1200, 2400, 4800, 9600, 19200, 38400, 57600, 115200)}
+
+# Tipos de erro que podem ser injetados
+SEM_RESPOSTA = "sem_resposta"
+CRC_ERRADO = "crc_errado"
+TRUNCADO = "truncado"
+EXCECAO = "excecao"       # exceção 0x04 (falha no escravo)
+ERROS = (SEM_RESPOSTA, CRC_ERRADO, TRUNCADO, EXCECAO)
+
+
+class EscravoSimulado:
+    """Uma estação meteorológica com o mapa de registradores do manual"""
+
+    def __init__(self, slave_id: int, baudrate: int = 4800, sem_irradiancia: bool = False,
+                 rnd: Optional[random.Random] = None):
+        self.slave_id = slave_id
+        self.sem_irradiancia = sem_irradiancia   # unidades antigas não têm 0x204
+        self.rnd = rnd or random.Random(slave_id)
+        codigo_baud = {b: c for c, b in CODIGOS_BAUDRATE.items()}.get(baudrate, 1)
+        self.config = {REG_SLAVE_ID: slave_id, REG_BAUDRATE: codigo_baud, REG_OFFSET_VENTO: 0}
+        # Valores físicos que evoluem devagar (mesma ideia de generate_realistic_data)
+        self.estado = {
+            "vento": 3.0, "direcao": 180.0, "umidade": 60.0, "temperatura": 22.0, "ruido": 45.0,
+            "pm25": 12.0, "pm10": 20.0, "pressao": 101.3, "lux": 25000.0, "chuva": 0.0, "solar": 400.0,
+        }
+
+    @property
+    def baudrate(self) -> int:
+        return CODIGOS_BAUDRATE.get(self.config[REG_BAUDRATE], 4800)
+
+    def _evoluir(self):
+        e, r = self.estado, self.rnd
+        e["vento"] = min(40.0, max(0.0, e["vento"] + r.uniform(-0.3, 0.3)))
+        e["direcao"] = (e["direcao"] + r.uniform(-5, 5)) % 360
+        e["umidade"] = min(99.0, max(5.0, e["umidade"] + r.uniform(-0.2, 0.2)))
+        e["temperatura"] = min(80.0, max(-40.0, e["temperatura"] + r.uniform(-0.05, 0.05)))
+        e["ruido"] = min(120.0, max(30.0, e["ruido"] + r.uniform(-1, 1)))
+        e["pm25"] = min(1000.0, max(0.0, e["pm25"] + r.uniform(-0.5, 0.5)))
+        e["pm10"] = max(e["pm25"], e["pm10"] + r.uniform(-0.5, 0.5))
+        e["pressao"] = min(120.0, max(80.0, e["pressao"] + r.uniform(-0.01, 0.01)))
+        e["lux"] = min(200000.0, max(0.0, e["lux"] + r.uniform(-500, 500)))
+        e["solar"] = min(1400.0, max(-50.0, e["solar"] + r.uniform(-5, 5)))
+
+    def medicoes(self) -> Dict[int, int]:
+        """Valores brutos (16 bits) dos registradores de medição"""
+        self._evoluir()
+        e = self.estado
+        direcao = (e["direcao"] + (180 if self.config[REG_OFFSET_VENTO] else 0)) % 360
+        lux = int(e["lux"])
+        regs = {
+            0x1F4: int(e["vento"] * 100),
+            0x1F5: min(12, int((e["vento"] / 0.836) ** (2 / 3))),   # escala Beaufort
+            0x1F6: int((direcao + 22.5) // 45) % 8,
+            0x1F7: int(direcao),
+            0x1F8: int(e["umidade"] * 10),
+            0x1F9: int(e["temperatura"] * 10) & 0xFFFF,
+            0x1FA: int(e["ruido"] * 10),
+            0x1FB: int(e["pm25"]),
+            0x1FC: int(e["pm10"]),
+            0x1FD: int(e["pressao"] * 10),
+            0x1FE: lux >> 16,
+            0x1FF: lux & 0xFFFF,
+            0x200: lux // 100,
+            0x201: int(e["chuva"] * 10),
+            0x202: 0,
+            0x203: 0,
+        }
+        if not self.sem_irradiancia:
+            regs[0x204] = int(e["solar"]) & 0xFFFF
+        return regs
+
+    def ler(self, addr: int, qtd: int) -> Optional[List[int]]:
+        """Valores de `qtd` registradores a partir de addr; None se algum não existir"""
+        regs = dict(self.config)
+        if addr + qtd > REG_MEDICOES.start and addr < REG_MEDICOES.stop:
+            regs.update(self.medicoes())
+        valores = [regs.get(a) for a in range(addr, addr + qtd)]
+        return None if None in valores else valores
+
+    def escrever(self, addr: int, valor: int) -> bool:
+        """FC06; False se o registrador não for gravável"""
+        if addr == REG_SLAVE_ID and 1 <= valor <= 254:
+            self.slave_id = valor
+            self.config[addr] = valor
+        elif addr == REG_BAUDRATE and valor in CODIGOS_BAUDRATE:
+            self.config[addr] = valor
+        elif addr == REG_OFFSET_VENTO and valor in (0, 1):
+            self.config[addr] = valor
+        elif addr == REG_ZERAR_VENTO and valor == 0xAA:
+            self.estado["vento"] = 0.0
+        elif addr == REG_ZERAR_CHUVA and valor == 0x5A:
+            self.estado["chuva"] = 0.0
+        else:
+            return False
+        return True
+
+
+class SimuladorBarramento:
+    """
+    Barramento RS485 simulado num par pseudo-terminal: os pollers abrem
+    `caminho` como se fosse a porta serial e N escravos respondem FC03/FC06
+    com o tempo de cada byte calculado pelo baud rate.
+    """
+
+    def __init__(self, ids: List[int], baudrate: int = 4800, latencia: float = 0.02,
+                 taxa_erro: float = 0.0, sem_irradiancia: tuple = (), semente: int = 0):
+        self.rnd = random.Random(semente)
+        self.escravos = {i: EscravoSimulado(i, baudrate, i in sem_irradiancia, random.Random(semente + i)) for i in ids}
+        self.latencia = latencia          # tempo de processamento antes de responder
+        self.taxa_erro = taxa_erro        # probabilidade de um erro aleatório por requisição
+        self._injetados: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self._rodando = False
+        self._thread = None
+        self.mestre_fd = None
+        self.escravo_fd = None
+        self.caminho = None
+        self.link = None
+        self.contadores = {"requisicoes": 0, "respostas": 0, "bytes_rx": 0, "bytes_tx": 0,
+                           "erros": 0, "ignoradas": 0}
+
+    # ---- ciclo de vida ----
+    def abrir(self, link: Optional[str] = None) -> str:
+        """Cria o par pty e devolve o caminho a ser usado como porta serial"""
+        self.mestre_fd, self.escravo_fd = os.openpty()
+        tty.setraw(self.mestre_fd)
+        tty.setraw(self.escravo_fd)
+        self.caminho = os.ttyname(self.escravo_fd)
+        if link:
+            if os.path.islink(link):
+                os.remove(link)
+            os.symlink(self.caminho, link)
+            self.link = link
+        return link or self.caminho
+
+    def iniciar(self, link: Optional[str] = None) -> str:
+        caminho = self.abrir(link) if self.mestre_fd is None else (self.link or self.caminho)
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, name="simulador-rs485", daemon=True)
+        self._thread.start()
+        return caminho
+
+    def parar(self):
+        self._rodando = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        for fd in (self.mestre_fd, self.escravo_fd):
+            if fd is not None:
+                os.close(fd)
+        self.mestre_fd = self.escravo_fd = None
+        if self.link and os.path.islink(self.link):
+            os.remove(self.link)
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    # ---- injeção de erros ----
+    def injetar(self, slave_id: int, erro: str, quantidade: int = 1):
+        """Faz as próximas `quantidade` respostas do escravo falharem com `erro`"""
+        if erro not in ERROS:
+            raise ValueError(f"Erro desconhecido: {erro} (use um de {ERROS})")
+        with self._lock:
+            self._injetados.setdefault(slave_id, []).extend([erro] * quantidade)
+
+    def _proximo_erro(self, slave_id: int) -> Optional[str]:
+        with self._lock:
+            fila = self._injetados.get(slave_id)
+            if fila:
+                return fila.pop(0)
+        if self.taxa_erro and self.rnd.random() < self.taxa_erro:
+            return self.rnd.choice(ERROS)
+        return None
+
+    # ---- barramento ----
+    def baudrate_mestre(self) -> Optional[int]:
+        """Baud rate configurado pelo poller (lido dos atributos termios do pty)"""
+        velocidade = termios.tcgetattr(self.mestre_fd)[5]
+        return VELOCIDADES_TERMIOS.get(velocidade)
+
+    def _loop(self):
+        buffer = bytearray()
+        while self._rodando:
+            prontos, _, _ = select.select([self.mestre_fd], [], [], 0.1)
+            if not prontos:
+                continue
+            try:
+                dados = os.read(self.mestre_fd, 256)
+            except OSError:
+                time.sleep(0.01)  # nenhum poller com a porta aberta
+                continue
+            self.contadores["bytes_rx"] += len(dados)
+            buffer.extend(dados)
+            # Requisições FC03/FC06 têm 8 bytes; sem CRC válido, ressincroniza byte a byte
+            while len(buffer) >= 8:
+                if crc_valido(bytes(buffer[:8])):
+                    self._atender(bytes(buffer[:8]))
+                    del buffer[:8]
+                else:
+                    del buffer[0]
+
+    def _atender(self, req: bytes):
+        self.contadores["requisicoes"] += 1
+        slave_id, funcao = req[0], req[1]
+        addr = int.from_bytes(req[2:4], byteorder="big")
+        valor = int.from_bytes(req[4:6], byteorder="big")
+
+        if slave_id == 0xFF:
+            # Broadcast: todos respondem ao mesmo tempo; com mais de um escravo é colisão
+            alvos = list(self.escravos.values())
+        else:
+            alvos = [e for e in self.escravos.values() if e.slave_id == slave_id]
+        if not alvos:
+            return
+        escravo = alvos[0]
+
+        baud_mestre = self.baudrate_mestre()
+        if baud_mestre is not None and baud_mestre != escravo.baudrate:
+            # Baud rate diferente: o escravo não entende o frame
+            self.contadores["ignoradas"] += 1
+            return
+
+        if funcao == 0x03:
+            valores = escravo.ler(addr, valor) if 1 <= valor <= 125 else None
+            if valores is None:
+                resp = bytes([slave_id, 0x83, 0x02])
+            else:
+                resp = bytes([slave_id, 0x03, 2 * valor]) + b"".join(v.to_bytes(2, "big") for v in valores)
+        elif funcao == 0x06:
+            # O eco sai no baud rate antigo, antes da troca valer
+            baud_resposta = escravo.baudrate
+            resp = req[:6] if escravo.escrever(addr, valor) else bytes([slave_id, 0x86, 0x02])
+            self._transmitir(resp + calcular_crc(resp), baud_resposta, len(alvos) > 1, slave_id)
+            return
+        else:
+            resp = bytes([slave_id, funcao | 0x80, 0x01])
+        self._transmitir(resp + calcular_crc(resp), escravo.baudrate, len(alvos) > 1, slave_id)
+
+    def _transmitir(self, frame: bytes, baudrate: int, colisao: bool, slave_id: int):
+        erro = self._proximo_erro(slave_id)
+        if colisao:
+            frame = bytes(b ^ self.rnd.getrandbits(8) for b in frame)
+        elif erro == SEM_RESPOSTA:
+            self.contadores["erros"] += 1
+            return
+        elif erro == CRC_ERRADO:
+            frame = frame[:-1] + bytes([frame[-1] ^ 0xFF])
+        elif erro == TRUNCADO:
+            frame = frame[:len(frame) // 2]
+        elif erro == EXCECAO:
+            frame = bytes([frame[0], frame[1] | 0x80, 0x04])
+            frame += calcular_crc(frame)
+        if erro:
+            self.contadores["erros"] += 1
+
+        time.sleep(self.latencia)
+        # Um byte a cada 11 bits (start + 8 dados + paridade/stop), no ritmo do baud rate
+        tempo_byte = 11 / baudrate
+        inicio = time.perf_counter()
+        for i, byte in enumerate(frame):
+            espera = inicio + i * tempo_byte - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            os.write(self.mestre_fd, bytes([byte]))
+        time.sleep(max(0.0, inicio + len(frame) * tempo_byte - time.perf_counter()))
+        self.contadores["respostas"] += 1
+        self.contadores["bytes_tx"] += len(frame)
+
+
+def faixa_ids(texto: str) -> List[int]:
+    """'1-5,8' → [1, 2, 3, 4, 5, 8]"""
+    ids = []
+    for parte in texto.split(","):
+        if "-" in parte:
+            a, b = parte.split("-")
+            ids.extend(range(int(a), int(b) + 1))
+        else:
+            ids.append(int(parte))
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de estações RS485 (Modbus RTU) num pseudo-terminal")
+    parser.add_argument("--ids", default="1-5", help="IDs dos escravos, ex.: 1-5,8")
+    parser.add_argument("--baudrate", type=int, default=4800)
+    parser.add_argument("--latencia", type=float, default=0.02, help="tempo de processamento do escravo (s)")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="probabilidade de erro por requisição")
+    parser.add_argument("--sem-irradiancia", default="", help="IDs sem o registrador 0x204, ex.: 2,3")
+    parser.add_argument("--link", default="/tmp/ttyESTACAO", help="link simbólico para a porta simulada")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sem_irradiancia = tuple(faixa_ids(args.sem_irradiancia)) if args.sem_irradiancia else ()
+    simulador = SimuladorBarramento(faixa_ids(args.ids), args.baudrate, args.latencia, args.taxa_erro, sem_irradiancia)
+    caminho = simulador.iniciar(args.link)
+    print(f"🛰️ Simulando {len(simulador.escravos)} estação(ões) @ {args.baudrate} baud em {caminho}")
+    print("   Aponte PORTA (ou --porta) dos pollers para esse caminho. Ctrl+C para sair.")
+    try:
+        while True:
+            time.sleep(10)
+            logger.info("Contadores: %s", simulador.contadores)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulador.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import argparse
+import gzip
+import json
+import logging
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import formato_binario
+from envio_api import CAMPOS_TEXTO
+
+logger = logging.getLogger(__name__)
+
+PREFIXO = "/api/v1/estacoes_mets"
+ROTA_ESTACAO = re.compile(rf"^{PREFIXO}/(\d+)/?$")
+ROTA_NOME = re.compile(r"(\d+)\s*$")     # "Estação 12" → 12
+
+CAMPO_DA_ABREVIACAO = {abrev: campo for abrev, campo, _ in CAMPOS_TEXTO}
+
+# Corpo que não dá para interpretar (JSON, binário truncado ou gzip corrompido) → 400
+ERROS_CORPO = (ValueError, KeyError, struct.error, EOFError, gzip.BadGzipFile, zlib.error)
+
+
+class EstacaoVirtual:
+    """Último valor de cada sensor de uma estação, como o IoT Hub guarda"""
+
+    def __init__(self, estacao: int, rnd: random.Random):
+        self.estacao = estacao
+        self.atualizada_em = datetime.now()
+        self.dados = {
+            "temperatura": round(rnd.uniform(15, 32), 1),
+            "umidade": round(rnd.uniform(40, 90), 1),
+            "pressao": float(rnd.randint(1005, 1020)),
+            "ruido": round(rnd.uniform(35, 70), 1),
+            "iluminancia": rnd.randint(0, 200000),
+            "chuva": round(rnd.choice([0, 0, 0, rnd.uniform(0, 20)]), 1),
+            "vento_velocidade": round(rnd.uniform(0, 20), 1),
+            "vento_direcao": rnd.randint(0, 359),
+            "pm25": rnd.randint(2, 60),
+            "pm10": rnd.randint(5, 90),
+        }
+
+    def atualizar(self, dados: Dict[str, float], momento: Optional[datetime] = None):
+        self.dados.update(dados)
+        self.atualizada_em = momento or datetime.now()
+
+    def resposta(self) -> Dict:
+        """Objeto arrResponse lido pelos dashboards (deploy_station.py / deploy_Station1.py)"""
+        d = self.dados
+        return {
+            "nome": f"Estação {self.estacao}",
+            "Última Leitura": self.atualizada_em.strftime("%d/%m/%Y %H:%M:%S"),
+            "Temperatura": f"{d['temperatura']:.1f} °C",
+            "Umidade": f"{d['umidade']:.1f} %",
+            "Pressão Atmosférica": f"{d['pressao']:.1f} hPa",
+            "Chuva": f"{d['chuva']:.1f} mm",
+            "Ruído": f"{d['ruido']:.1f} dB",
+            "Luminosidade": d["iluminancia"],
+            "Vento": f"{d['vento_velocidade']:.1f} km/h",
+            "Direção do Vento": f"{d['vento_direcao']:.0f} °",
+            "PM2.5": d["pm25"],
+            "PM10": d["pm10"],
+            # deploy_station.py usa os nomes longos
+            "Partículas por Milhão 2.5": d["pm25"],
+            "Partículas por Milhão 10": d["pm10"],
+        }
+
+
+class SimuladorIotHub:
+    """
+    Servidor HTTP local no lugar do IoT Hub: storeOrUpdate (texto JSON, lista
+    JSON ou formato_binario) e GET estacoes_mets/{id} com a mesma forma
+    `arrResponse`. Latência e erros configuráveis para medir o envio e os
+    dashboards numa máquina só. Com `aceita_lista=False` uma lista JSON é
+    recusada com 415, como um servidor que só conhece um objeto por POST.
+    """
+
+    def __init__(self, n_estacoes: int = 12, latencia: float = 0.05, variacao: float = 0.0,
+                 taxa_erro: float = 0.0, taxa_travamento: float = 0.0, travamento: float = 30.0,
+                 semente: int = 0, aceita_lista: bool = True):
+        self.rnd = random.Random(semente)
+        self.estacoes = {i: EstacaoVirtual(i, random.Random(semente + i)) for i in range(1, n_estacoes + 1)}
+        self.latencia = latencia                # atraso de cada resposta (s)
+        self.variacao = variacao                # ± aleatório sobre a latência (s)
+        self.taxa_erro = taxa_erro              # probabilidade de responder 503
+        self.taxa_travamento = taxa_travamento  # probabilidade de segurar a resposta por `travamento` s
+        self.travamento = travamento
+        self.aceita_lista = aceita_lista
+        self._lock = threading.Lock()
+        self.servidor = None
+        self._thread = None
+        self.contadores = {"get": 0, "post": 0, "leituras_recebidas": 0, "bytes_recebidos": 0,
+                           "erros_injetados": 0, "travamentos": 0, "nao_encontrado": 0, "listas_recusadas": 0}
+
+    # ---- ciclo de vida ----
+    def iniciar(self, host: str = "127.0.0.1", porta: int = 0) -> str:
+        """Sobe o servidor numa thread e devolve a URL base (para IOTHUB_URL)"""
+        simulador = self
+
+        class Atendente(_Atendente):
+            pass
+        Atendente.simulador = simulador
+
+        self.servidor = ThreadingHTTPServer((host, porta), Atendente)
+        self.servidor.daemon_threads = True
+        self._thread = threading.Thread(target=self.servidor.serve_forever, name="simulador-iothub", daemon=True)
+        self._thread.start()
+        return self.url_base
+
+    @property
+    def url_base(self) -> str:
+        host, porta = self.servidor.server_address[:2]
+        return f"http://{host}:{porta}/api/v1"
+
+    def parar(self):
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+            self.servidor = None
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    # ---- comportamento ----
+    def _contar(self, chave: str, quantidade: int = 1):
+        with self._lock:
+            self.contadores[chave] += quantidade
+
+    def sortear_falha(self) -> Optional[str]:
+        """Espera a latência configurada e decide se esta resposta falha"""
+        with self._lock:
+            sorteio = self.rnd.random()
+            atraso = max(0.0, self.latencia + self.rnd.uniform(-self.variacao, self.variacao))
+        time.sleep(atraso)
+        if sorteio < self.taxa_travamento:
+            self._contar("travamentos")
+            time.sleep(self.travamento)
+            return "travamento"
+        if sorteio < self.taxa_travamento + self.taxa_erro:
+            self._contar("erros_injetados")
+            return "erro"
+        return None
+
+    def gravar(self, corpo: bytes, tipo: str) -> int:
+        """Aplica um storeOrUpdate e devolve quantas leituras foram gravadas"""
+        if tipo.startswith(formato_binario.TIPO_CONTEUDO):
+            leituras = [(l["estacao"], l["dados"], datetime.fromtimestamp(l["momento"]))
+                        for l in formato_binario.decodificar(corpo)]
+        else:
+            payloads = json.loads(corpo)
+            if isinstance(payloads, dict):
+                payloads = [payloads]
+            leituras = []
+            for payload in payloads:
+                estacao = ROTA_NOME.search(payload["nome"])
+                if estacao is None:
+                    raise ValueError(f"Nome de estação sem número: {payload['nome']}")
+                dados = {}
+                for parte in filter(None, payload.get("sensores", "").split("|")):
+                    abrev, valor = parte.split(":")
+                    dados[CAMPO_DA_ABREVIACAO[abrev]] = float(valor)
+                momento = payload.get("data_leitura")
+                leituras.append((int(estacao.group(1)), dados, datetime.fromisoformat(momento) if momento else None))
+        with self._lock:
+            for estacao, dados, momento in leituras:
+                if estacao not in self.estacoes:
+                    self.estacoes[estacao] = EstacaoVirtual(estacao, random.Random(estacao))
+                self.estacoes[estacao].atualizar(dados, momento)
+            self.contadores["leituras_recebidas"] += len(leituras)
+            self.contadores["bytes_recebidos"] += len(corpo)
+        return len(leituras)
+
+    def consultar(self, estacao: int) -> Optional[Dict]:
+        with self._lock:
+            virtual = self.estacoes.get(estacao)
+            return virtual.resposta() if virtual else None
+
+
+class _Atendente(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, como o servidor real
+    # Cabeçalhos e corpo saem em duas escritas: sem isso o Nagle segura o
+    # corpo até o ACK atrasado do cliente (~40 ms por resposta no keep-alive)
+    disable_nagle_algorithm = True
+    simulador: SimuladorIotHub = None
+
+    def _responder(self, status: int, corpo: Dict):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        try:
+            self.wfile.write(dados)
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desistiu antes (timeout / prazo do dashboard): não é erro do simulador
+            self.close_connection = True
+
+    def do_GET(self):
+        self.simulador._contar("get")
+        rota = ROTA_ESTACAO.match(self.path)
+        if self.path.rstrip("/") == f"{PREFIXO}/metricas":
+            return self._responder(200, self.simulador.contadores)
+        if self.simulador.sortear_falha():
+            return self._responder(503, {"erro": "indisponível (simulado)"})
+        resposta = self.simulador.consultar(int(rota.group(1))) if rota else None
+        if resposta is None:
+            self.simulador._contar("nao_encontrado")
+            return self._responder(404, {"erro": "estação não encontrada"})
+        self._responder(200, {"arrResponse": resposta})
+
+    def do_POST(self):
+        self.simulador._contar("post")
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") != f"{PREFIXO}/storeOrUpdate":
+            return self._responder(404, {"erro": "rota não encontrada"})
+        if self.simulador.sortear_falha():
+            return self._responder(503, {"erro": "indisponível (simulado)"})
+        if not self.simulador.aceita_lista and corpo.lstrip().startswith(b"["):
+            self.simulador._contar("listas_recusadas")
+            return self._responder(415, {"erro": "lista JSON não suportada (simulado)"})
+        try:
+            gravadas = self.simulador.gravar(corpo, self.headers.get("Content-Type", "application/json"))
+        except ERROS_CORPO as e:
+            return self._responder(400, {"erro": f"{type(e).__name__}: {e}"})
+        self._responder(200, {"status": "ok", "gravadas": gravadas})
+
+    def log_message(self, formato, *args):
+        logger.debug("%s - %s", self.address_string(), formato % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IoT Hub simulado (storeOrUpdate e estacoes_mets/{id}) para testes locais")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--estacoes", type=int, default=12, help="quantidade de estações virtuais")
+    parser.add_argument("--latencia", type=float, default=0.05, help="atraso de cada resposta (s)")
+    parser.add_argument("--variacao", type=float, default=0.0, help="± aleatório sobre a latência (s)")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="probabilidade de responder 503")
+    parser.add_argument("--taxa-travamento", type=float, default=0.0, help="probabilidade de não responder a tempo")
+    parser.add_argument("--travamento", type=float, default=30.0, help="quanto uma resposta travada demora (s)")
+    parser.add_argument("--sem-lista", action="store_true", help="recusar lista JSON no storeOrUpdate (415)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    simulador = SimuladorIotHub(args.estacoes, args.latencia, args.variacao, args.taxa_erro,
+                                args.taxa_travamento, args.travamento, aceita_lista=not args.sem_lista)
+    url = simulador.iniciar(args.host, args.porta)
+    print(f"🛰️ IoT Hub simulado com {args.estacoes} estação(ões) em {url}")
+    print(f"   Use IOTHUB_URL={url} nos scripts. Ctrl+C para sair.")
+    try:
+        while True:
+            time.sleep(10)
+            logger.info("Contadores: %s", simulador.contadores)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulador.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,15 +17,38 @@ dados_vento_velocidade = []
 dados_vento_direcao = []
 tempos = []
 
+# Porta serial mantida aberta entre os comandos (reaberta após erro)
+PORTA = 'COM15'
+BAUDRATE = 4800
+porta_serial = None
+
+def obter_porta():
+    global porta_serial
+    if porta_serial is None or not porta_serial.is_open:
+        porta_serial = serial.Serial(port=PORTA, baudrate=BAUDRATE, timeout=1)
+    return porta_serial
+
+def fechar_porta():
+    global porta_serial
+    if porta_serial is not None:
+        try:
+            porta_serial.close()
+        except serial.SerialException:
+            pass
+        porta_serial = None
+
 # Função para enviar comando e tratar exceções de conexão serial
 def enviar_comando(comando):
     try:
         comando_bytes = bytes.fromhex(comando)
-        with serial.Serial(port='COM15', baudrate=4800, timeout=1) as ser:
-            ser.write(comando_bytes)
-            resposta = ser.read(7)
-            return resposta
+        ser = obter_porta()
+        ser.reset_input_buffer()
+        ser.write(comando_bytes)
+        resposta = ser.read(7)
+        return resposta
     except serial.SerialException as e:
+        # Descarta a porta com erro; o próximo comando tenta reabrir
+        fechar_porta()
         messagebox.showerror("Erro de Conexão Serial", f"Erro ao acessar a porta COM: {e}")
         return None
 
@@ -171,3 +194,4 @@ canvas.draw()
 
 # Iniciar a aplicação tkinter
 root.mainloop()
+fechar_porta()
@@ -2,6 +2,8 @@ import serial
 import time
 from datetime import datetime
 
+from modbus_rtu import ErroModbus, montar_comando, transacao
+
 # Configurações da porta serial
 PORTA = "COM19"
 BAUDRATE = 4800
@@ -26,41 +28,14 @@ SENSORES = {
     "Rainfall (mm)":           (0x201, 0.1),
 }
 
-# Função para calcular CRC16 Modbus
-def calcular_crc(data: bytes) -> bytes:
-    crc = 0xFFFF
-    for pos in data:
-        crc ^= pos
-        for _ in range(8):
-            if (crc & 1) != 0:
-                crc >>= 1
-                crc ^= 0xA001
-            else:
-                crc >>= 1
-    return crc.to_bytes(2, byteorder='little')
-
-# Monta comando Modbus RTU
-def montar_comando(slave_id: int, addr: int, qtd: int = 1) -> bytes:
-    msg = bytearray()
-    msg.append(slave_id)
-    msg.append(0x03)  # função: read holding register
-    msg.append((addr >> 8) & 0xFF)
-    msg.append(addr & 0xFF)
-    msg.append(0x00)
-    msg.append(qtd)
-    crc = calcular_crc(msg)
-    msg.extend(crc)
-    return bytes(msg)
-
 # Envia comando e lê resposta
 def ler_registro(ser, slave_id: int, addr: int, scale: float):
-    cmd = montar_comando(slave_id, addr, 1)
-    ser.write(cmd)
-    resp = ser.read(7)  # resposta esperada = 7 bytes
-    if len(resp) == 7 and resp[0] == slave_id and resp[1] == 0x03:
-        valor = int.from_bytes(resp[3:5], byteorder="big")
-        return valor * scale
-    return None
+    try:
+        resp = transacao(ser, montar_comando(slave_id, addr, 1))
+    except ErroModbus:
+        return None
+    valor = int.from_bytes(resp[3:5], byteorder="big")
+    return valor * scale
 
 def main():
     with serial.Serial(port=PORTA, baudrate=BAUDRATE, timeout=TIMEOUT) as ser: